@@ -16,6 +16,54 @@ from freqtrade.optimize.hyperopt_interface import IHyperOpt
 import talib.abstract as ta  # noqa
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
+from strategy_helpers.bbrsi_indicators import add_bollinger_bands
+
+
+BUY_TRIGGERS = {
+    'tr_bb_lower_1sd': 'bb_lowerband_1sd',
+    'tr_bb_lower_2sd': 'bb_lowerband_2sd',
+    'tr_bb_lower_3sd': 'bb_lowerband_3sd',
+    'tr_bb_lower_4sd': 'bb_lowerband_4sd',
+}
+
+SELL_TRIGGERS = {
+    'sell_tr_bb_lower_1sd': 'bb_lowerband_1sd',
+    'sell_tr_bb_mid_1sd': 'bb_middleband_1sd',
+    'sell_tr_bb_upper_1sd': 'bb_upperband_1sd',
+}
+
+
+def signal_matrix(dataframe: DataFrame, params_list: List[Dict[str, Any]],
+                  rsi_column: str, rsi_value: str, rsi_enabled: str,
+                  trigger: str, triggers: Dict[str, str], trigger_op: Callable) -> np.ndarray:
+    """
+    Evaluate the signals of many parameter sets with NumPy broadcasting.
+    The RSI values become a threshold vector and the triggers an index in the stacked bands.
+    :return: len(params_list) x len(dataframe) boolean matrix
+    """
+    close = dataframe['close'].to_numpy(dtype=np.float64)
+
+    # GUARDS AND TRENDS
+    enabled = np.array([bool(params.get(rsi_enabled)) for params in params_list])
+    thresholds = np.array([params[rsi_value] if params.get(rsi_enabled) else 0
+                           for params in params_list], dtype=np.float64)
+    rsi = dataframe[rsi_column].to_numpy(dtype=np.float64)
+    signals = ~enabled[:, None] | (rsi[None, :] > thresholds[:, None])
+
+    # TRIGGERS - the last row is for the parameter sets without trigger
+    columns = list(triggers.values())
+    bands = np.stack([dataframe[column].to_numpy(dtype=np.float64) for column in columns])
+    trigger_hits = np.vstack([trigger_op(close[None, :], bands), np.ones((1, len(close)), dtype=bool)])
+    trigger_index = np.array([columns.index(triggers[params[trigger]])
+                              if params.get(trigger) in triggers else len(columns)
+                              for params in params_list], dtype=np.intp)
+    signals &= trigger_hits[trigger_index]
+
+    # Check that the candle had volume
+    signals &= (dataframe['volume'].to_numpy() > 0)[None, :]
+
+    return signals
+
 
 class BBRSIHyperopt(IHyperOpt):
     """
@@ -43,26 +91,8 @@ class BBRSIHyperopt(IHyperOpt):
         dataframe['rsi-buy'] = ta.RSI(dataframe)
         dataframe['rsi-sell'] = ta.RSI(dataframe)
 
-        # Bollinger bands
-        bollinger_1sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=1)
-        dataframe['bb_lowerband_1sd'] = bollinger_1sd['lower']
-        dataframe['bb_middleband_1sd'] = bollinger_1sd['mid']
-        dataframe['bb_upperband_1sd'] = bollinger_1sd['upper']
-
-        bollinger_2sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=2)
-        dataframe['bb_lowerband_2sd'] = bollinger_2sd['lower']
-        dataframe['bb_middleband_2sd'] = bollinger_2sd['mid']
-        dataframe['bb_upperband_2sd'] = bollinger_2sd['upper']
-
-        bollinger_3sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=3)
-        dataframe['bb_lowerband_3sd'] = bollinger_3sd['lower']
-        dataframe['bb_middleband_3sd'] = bollinger_3sd['mid']
-        dataframe['bb_upperband_3sd'] = bollinger_3sd['upper']
-
-        bollinger_4sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=4)
-        dataframe['bb_lowerband_4sd'] = bollinger_4sd['lower']
-        dataframe['bb_middleband_4sd'] = bollinger_4sd['mid']
-        dataframe['bb_upperband_4sd'] = bollinger_4sd['upper']
+        # Bollinger bands (1sd to 4sd computed in a single pass)
+        add_bollinger_bands(dataframe, window=20, stds=(1, 2, 3, 4))
 
         return dataframe
 
@@ -115,6 +145,15 @@ class BBRSIHyperopt(IHyperOpt):
 
         return populate_buy_trend
 
+    @staticmethod
+    def buy_signal_matrix(dataframe: DataFrame, params_list: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Batch version of buy_strategy_generator, to score many candidate points in one pass.
+        :return: N x T boolean matrix, row i is where the 'buy' column is set for params_list[i]
+        """
+        return signal_matrix(dataframe, params_list, 'rsi-buy', 'rsi-value', 'rsi-enabled',
+                             'buy-trigger', BUY_TRIGGERS, np.less)
+
     @staticmethod
     def sell_indicator_space() -> List[Dimension]:
         """
@@ -163,3 +202,12 @@ class BBRSIHyperopt(IHyperOpt):
             return dataframe
 
         return populate_sell_trend
+
+    @staticmethod
+    def sell_signal_matrix(dataframe: DataFrame, params_list: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Batch version of sell_strategy_generator, to score many candidate points in one pass.
+        :return: N x T boolean matrix, row i is where the 'sell' column is set for params_list[i]
+        """
+        return signal_matrix(dataframe, params_list, 'rsi-sell', 'sell-rsi-value', 'sell-rsi-enabled',
+                             'sell-trigger', SELL_TRIGGERS, np.greater)
@@ -0,0 +1,238 @@
+"""
+Vectorized versions of the hyperopt loss functions used by the sweep.
+
+The losses are computed with NumPy on contiguous arrays of profit ratios, trade durations
+and close dates, the daily losses with precomputed day indices instead of a pandas resample.
+The kernels score a batch of epochs at once: the trades of all the epochs are concatenated,
+with the index of their epoch.
+
+The loss classes give the same objective as the freqtrade loss of the same name (and as
+SampleHyperOptLoss for ShortTradeDurHyperOptLossVectorized), e.g.:
+
+    freqtrade hyperopt --hyperopt-loss SharpeHyperOptLossDailyVectorized ...
+"""
+from datetime import datetime
+from typing import Callable, Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.optimize.hyperopt import IHyperOptLoss
+
+
+# Constants of the freqtrade loss functions
+
+# ShortTradeDurHyperOptLoss / SampleHyperOptLoss
+TARGET_TRADES = 600
+EXPECTED_MAX_PROFIT = 3.0
+MAX_ACCEPTED_TRADE_DURATION = 300
+
+# Sharpe / Sortino
+SLIPPAGE_PER_TRADE_RATIO = 0.0005
+DAYS_IN_YEAR = 365
+NO_RISK_RATIO = -20.
+
+DAY = 86400 * 10 ** 9
+
+
+def trade_arrays(results: DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Profit ratios, durations (minutes) and close dates (ns) of the trades of a backtest."""
+    profit = results['profit_ratio'].to_numpy(dtype=np.float64)
+    duration = results['trade_duration'].to_numpy(dtype=np.float64)
+    close_date = results['close_date'].values.astype('datetime64[ns]').view(np.int64)
+    return profit, duration, close_date
+
+
+def day_index(close_date: np.ndarray, min_date: datetime, max_date: datetime) -> Tuple[np.ndarray, int]:
+    """
+    Index of the day of each close date in the days of the backtest (-1 outside),
+    and the number of days: the days of date_range(min_date, max_date, freq='1D', normalize=True).
+    """
+    first_day = pd.Timestamp(min_date).value // DAY
+    nb_days = pd.Timestamp(max_date).value // DAY - first_day + 1
+    days = close_date // DAY - first_day
+    days[(days < 0) | (days >= nb_days)] = -1
+    return days, int(nb_days)
+
+
+def _epoch_sums(values: np.ndarray, epochs: np.ndarray, nb_epochs: int) -> np.ndarray:
+    return np.bincount(epochs, weights=values, minlength=nb_epochs)
+
+
+def _epoch_std(values: np.ndarray, epochs: np.ndarray, nb_epochs: int, counts: np.ndarray) -> np.ndarray:
+    """Population std (np.std) of the values of each epoch, in two passes for the precision."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = _epoch_sums(values, epochs, nb_epochs) / counts
+        return np.sqrt(_epoch_sums((values - means[epochs]) ** 2, epochs, nb_epochs) / counts)
+
+
+def _ratio_loss(returns_mean: np.ndarray, stdev: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = returns_mean / stdev * np.sqrt(DAYS_IN_YEAR)
+    return -np.where(stdev != 0, ratio, NO_RISK_RATIO)
+
+
+def short_trade_dur_losses(profit: np.ndarray, duration: np.ndarray,
+                           epochs: np.ndarray, nb_epochs: int) -> np.ndarray:
+    counts = np.bincount(epochs, minlength=nb_epochs)
+    total_profit = _epoch_sums(profit, epochs, nb_epochs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        trade_duration = _epoch_sums(duration, epochs, nb_epochs) / counts
+
+    trade_loss = 1 - 0.25 * np.exp(-(counts - TARGET_TRADES) ** 2 / 10 ** 5.8)
+    profit_loss = np.maximum(0, 1 - total_profit / EXPECTED_MAX_PROFIT)
+    duration_loss = 0.4 * np.minimum(trade_duration / MAX_ACCEPTED_TRADE_DURATION, 1)
+    return trade_loss + profit_loss + duration_loss
+
+
+def only_profit_losses(profit: np.ndarray, epochs: np.ndarray, nb_epochs: int) -> np.ndarray:
+    return 1 - _epoch_sums(profit, epochs, nb_epochs) / EXPECTED_MAX_PROFIT
+
+
+def sharpe_losses(profit: np.ndarray, epochs: np.ndarray, nb_epochs: int, days_period: int) -> np.ndarray:
+    counts = np.bincount(epochs, minlength=nb_epochs)
+    profit = profit - SLIPPAGE_PER_TRADE_RATIO
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns_mean = _epoch_sums(profit, epochs, nb_epochs) / days_period
+    return _ratio_loss(returns_mean, _epoch_std(profit, epochs, nb_epochs, counts))
+
+
+def sortino_losses(profit: np.ndarray, epochs: np.ndarray, nb_epochs: int, days_period: int) -> np.ndarray:
+    counts = np.bincount(epochs, minlength=nb_epochs)
+    after_slippage = profit - SLIPPAGE_PER_TRADE_RATIO
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns_mean = _epoch_sums(after_slippage, epochs, nb_epochs) / days_period
+    # Profit ratio (without slippage) of the losing trades
+    downside = np.where(after_slippage < 0, profit, 0.)
+    return _ratio_loss(returns_mean, _epoch_std(downside, epochs, nb_epochs, counts))
+
+
+def daily_profits(profit: np.ndarray, days: np.ndarray, nb_days: int,
+                  epochs: np.ndarray, nb_epochs: int) -> np.ndarray:
+    """(epochs x days) sums of the profit ratios after slippage, 0 for the days without trade."""
+    inside = days >= 0
+    cells = epochs[inside] * nb_days + days[inside]
+    sums = np.bincount(cells, weights=profit[inside] - SLIPPAGE_PER_TRADE_RATIO, minlength=nb_epochs * nb_days)
+    return sums.reshape(nb_epochs, nb_days)
+
+
+def sharpe_daily_losses(profit: np.ndarray, days: np.ndarray, nb_days: int,
+                        epochs: np.ndarray, nb_epochs: int) -> np.ndarray:
+    daily = daily_profits(profit, days, nb_days, epochs, nb_epochs)
+    # Sample std, as pandas Series.std
+    stdev = daily.std(axis=1, ddof=1) if nb_days > 1 else np.full(nb_epochs, np.nan)
+    return _ratio_loss(daily.mean(axis=1), stdev)
+
+
+def sortino_daily_losses(profit: np.ndarray, days: np.ndarray, nb_days: int,
+                         epochs: np.ndarray, nb_epochs: int) -> np.ndarray:
+    daily = daily_profits(profit, days, nb_days, epochs, nb_epochs)
+    downside = np.minimum(daily, 0.)
+    return _ratio_loss(daily.mean(axis=1), np.sqrt((downside ** 2).sum(axis=1) / nb_days))
+
+
+def score_batch(loss_function: str, results_list: Sequence[DataFrame],
+                min_date: datetime, max_date: datetime) -> np.ndarray:
+    """
+    Losses of several epochs (backtest results over the same period) in one pass.
+    :param loss_function: name of the freqtrade loss, e.g. 'SharpeHyperOptLossDaily'
+    """
+    arrays = [trade_arrays(results) for results in results_list]
+    counts = [len(profit) for profit, _, _ in arrays]
+    nb_epochs = len(arrays)
+    epochs = np.repeat(np.arange(nb_epochs), counts)
+    profit = np.concatenate([a[0] for a in arrays]) if arrays else np.empty(0)
+    duration = np.concatenate([a[1] for a in arrays]) if arrays else np.empty(0)
+    close_date = np.concatenate([a[2] for a in arrays]) if arrays else np.empty(0, dtype=np.int64)
+
+    return BATCH_LOSSES[loss_function](profit, duration, close_date, epochs, nb_epochs, min_date, max_date)
+
+
+BATCH_LOSSES: Dict[str, Callable[..., np.ndarray]] = {
+    'ShortTradeDurHyperOptLoss':
+        lambda profit, duration, close_date, epochs, nb_epochs, min_date, max_date:
+            short_trade_dur_losses(profit, duration, epochs, nb_epochs),
+    'OnlyProfitHyperOptLoss':
+        lambda profit, duration, close_date, epochs, nb_epochs, min_date, max_date:
+            only_profit_losses(profit, epochs, nb_epochs),
+    'SharpeHyperOptLoss':
+        lambda profit, duration, close_date, epochs, nb_epochs, min_date, max_date:
+            sharpe_losses(profit, epochs, nb_epochs, (max_date - min_date).days),
+    'SortinoHyperOptLoss':
+        lambda profit, duration, close_date, epochs, nb_epochs, min_date, max_date:
+            sortino_losses(profit, epochs, nb_epochs, (max_date - min_date).days),
+    'SharpeHyperOptLossDaily':
+        lambda profit, duration, close_date, epochs, nb_epochs, min_date, max_date:
+            sharpe_daily_losses(profit, *day_index(close_date, min_date, max_date), epochs, nb_epochs),
+    'SortinoHyperOptLossDaily':
+        lambda profit, duration, close_date, epochs, nb_epochs, min_date, max_date:
+            sortino_daily_losses(profit, *day_index(close_date, min_date, max_date), epochs, nb_epochs),
+}
+BATCH_LOSSES['SampleHyperOptLoss'] = BATCH_LOSSES['ShortTradeDurHyperOptLoss']
+
+
+def _loss(loss_function: str, results: DataFrame, min_date: datetime, max_date: datetime) -> float:
+    profit, duration, close_date = trade_arrays(results)
+    epochs = np.zeros(len(profit), dtype=np.int64)
+    return float(BATCH_LOSSES[loss_function](profit, duration, close_date, epochs, 1, min_date, max_date)[0])
+
+
+class ShortTradeDurHyperOptLossVectorized(IHyperOptLoss):
+    """ShortTradeDurHyperOptLoss (and SampleHyperOptLoss): trade count, profit and duration."""
+
+    @staticmethod
+    def hyperopt_loss_function(results: DataFrame, trade_count: int,
+                               min_date: datetime, max_date: datetime,
+                               *args, **kwargs) -> float:
+        return _loss('ShortTradeDurHyperOptLoss', results, min_date, max_date)
+
+
+class OnlyProfitHyperOptLossVectorized(IHyperOptLoss):
+    """OnlyProfitHyperOptLoss: total profit only."""
+
+    @staticmethod
+    def hyperopt_loss_function(results: DataFrame, trade_count: int,
+                               min_date: datetime, max_date: datetime,
+                               *args, **kwargs) -> float:
+        return _loss('OnlyProfitHyperOptLoss', results, min_date, max_date)
+
+
+class SharpeHyperOptLossVectorized(IHyperOptLoss):
+    """SharpeHyperOptLoss: Sharpe ratio of the trades."""
+
+    @staticmethod
+    def hyperopt_loss_function(results: DataFrame, trade_count: int,
+                               min_date: datetime, max_date: datetime,
+                               *args, **kwargs) -> float:
+        return _loss('SharpeHyperOptLoss', results, min_date, max_date)
+
+
+class SortinoHyperOptLossVectorized(IHyperOptLoss):
+    """SortinoHyperOptLoss: Sortino ratio of the trades."""
+
+    @staticmethod
+    def hyperopt_loss_function(results: DataFrame, trade_count: int,
+                               min_date: datetime, max_date: datetime,
+                               *args, **kwargs) -> float:
+        return _loss('SortinoHyperOptLoss', results, min_date, max_date)
+
+
+class SharpeHyperOptLossDailyVectorized(IHyperOptLoss):
+    """SharpeHyperOptLossDaily: Sharpe ratio of the daily profits."""
+
+    @staticmethod
+    def hyperopt_loss_function(results: DataFrame, trade_count: int,
+                               min_date: datetime, max_date: datetime,
+                               *args, **kwargs) -> float:
+        return _loss('SharpeHyperOptLossDaily', results, min_date, max_date)
+
+
+class SortinoHyperOptLossDailyVectorized(IHyperOptLoss):
+    """SortinoHyperOptLossDaily: Sortino ratio of the daily profits."""
+
+    @staticmethod
+    def hyperopt_loss_function(results: DataFrame, trade_count: int,
+                               min_date: datetime, max_date: datetime,
+                               *args, **kwargs) -> float:
+        return _loss('SortinoHyperOptLossDaily', results, min_date, max_date)
@@ -14,6 +14,8 @@ from freqtrade.strategy import CategoricalParameter, DecimalParameter, IntParame
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
+from strategy_helpers.bbrsi_indicators import add_bollinger_bands
+
 class BBRSINaiveStrategyWithHyperoptCode(IStrategy):
     # Strategy interface version - allow new iterations of the strategy interface.
     # Check the documentation or the Sample strategy to get the latest version.
@@ -104,26 +106,8 @@ class BBRSINaiveStrategyWithHyperoptCode(IStrategy):
         # RSI
         dataframe['rsi'] = ta.RSI(dataframe)
 
-        # Bollinger bands
-        bollinger_1sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=1)
-        dataframe['bb_lowerband_1sd'] = bollinger_1sd['lower']
-        dataframe['bb_middleband_1sd'] = bollinger_1sd['mid']
-        dataframe['bb_upperband_1sd'] = bollinger_1sd['upper']
-
-        bollinger_2sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=2)
-        dataframe['bb_lowerband_2sd'] = bollinger_2sd['lower']
-        dataframe['bb_middleband_2sd'] = bollinger_2sd['mid']
-        dataframe['bb_upperband_2sd'] = bollinger_2sd['upper']
-
-        bollinger_3sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=3)
-        dataframe['bb_lowerband_3sd'] = bollinger_3sd['lower']
-        dataframe['bb_middleband_3sd'] = bollinger_3sd['mid']
-        dataframe['bb_upperband_3sd'] = bollinger_3sd['upper']
-
-        bollinger_4sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=4)
-        dataframe['bb_lowerband_4sd'] = bollinger_4sd['lower']
-        dataframe['bb_middleband_4sd'] = bollinger_4sd['mid']
-        dataframe['bb_upperband_4sd'] = bollinger_4sd['upper']
+        # Bollinger bands (1sd to 4sd computed in a single pass)
+        add_bollinger_bands(dataframe, window=20, stds=(1, 2, 3, 4))
 
         return dataframe
 
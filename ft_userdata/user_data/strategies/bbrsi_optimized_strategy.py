@@ -11,9 +11,13 @@ from freqtrade.strategy.interface import IStrategy
 # Add your lib to import here
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
+from freqtrade.enums import RunMode
+
+from strategy_helpers.bbrsi_incremental import IncrementalBBRSI
+from strategy_helpers.strategy_timing import TimedStrategyMixin
 
 # Based on the Hyperopt results when running against BBRISHyperopt
-class BBRSIOptimizedStrategy(IStrategy):
+class BBRSIOptimizedStrategy(TimedStrategyMixin, IStrategy):
     # Strategy interface version - allow new iterations of the strategy interface.
     # Check the documentation or the Sample strategy to get the latest version.
     INTERFACE_VERSION = 2
@@ -91,7 +95,21 @@ class BBRSIOptimizedStrategy(IStrategy):
         """
         return []
 
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        # Live / dry-run: the Bollinger bands of each pair are only computed for the new candles
+        self.incremental_indicators = IncrementalBBRSI(rsi_period=14, bb_window=20, stds=(2,))
+
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        if self.dp and self.dp.runmode in (RunMode.LIVE, RunMode.DRY_RUN):
+            # RSI and Bollinger bands updated with the new candles (see bbrsi_incremental.py)
+            indicators = self.incremental_indicators.update(metadata['pair'], dataframe)
+            dataframe['rsi'] = indicators['rsi']
+            dataframe['bb_upperband'] = indicators['bb_upperband_2sd']
+            dataframe['bb_midband'] = indicators['bb_middleband']
+            dataframe['bb_lowerband'] = indicators['bb_lowerband_2sd']
+            return dataframe
+
         # RSI
         dataframe['rsi'] = ta.RSI(dataframe)
 
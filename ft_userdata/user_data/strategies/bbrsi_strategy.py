@@ -12,7 +12,10 @@ from freqtrade.strategy.interface import IStrategy
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
-class BBRSIStrategy(IStrategy):
+from strategy_helpers.bbrsi_indicators import bollinger_bands
+from strategy_helpers.strategy_timing import TimedStrategyMixin
+
+class BBRSIStrategy(TimedStrategyMixin, IStrategy):
     # Strategy interface version - allow new iterations of the strategy interface.
     # Check the documentation or the Sample strategy to get the latest version.
     INTERFACE_VERSION = 2
@@ -97,13 +100,11 @@ class BBRSIStrategy(IStrategy):
         # RSI
         dataframe['rsi'] = ta.RSI(dataframe)
 
-        # Bollinger bands
-        bollinger_1sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=1)
-        dataframe['bb_upperband_1sd'] = bollinger_1sd['upper']
-        dataframe['bb_lowerband_1sd'] = bollinger_1sd['lower']
-
-        bollinger_4sd = qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window=20, stds=4)
-        dataframe['bb_lowerband_4sd'] = bollinger_4sd['lower']
+        # Bollinger bands (1sd and 4sd computed in a single pass)
+        bollinger = bollinger_bands(dataframe, window=20, stds=(1, 4))
+        dataframe['bb_upperband_1sd'] = bollinger['upper_1sd']
+        dataframe['bb_lowerband_1sd'] = bollinger['lower_1sd']
+        dataframe['bb_lowerband_4sd'] = bollinger['lower_4sd']
 
         return dataframe
 
@@ -12,7 +12,9 @@ from freqtrade.strategy.interface import IStrategy
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
-class QuickBuyStrategy(IStrategy):
+from strategy_helpers.strategy_timing import TimedStrategyMixin
+
+class QuickBuyStrategy(TimedStrategyMixin, IStrategy):
     # Strategy interface version - allow new iterations of the strategy interface.
     # Check the documentation or the Sample strategy to get the latest version.
     INTERFACE_VERSION = 2
@@ -12,9 +12,11 @@ from freqtrade.strategy.interface import IStrategy
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
+from strategy_helpers.strategy_timing import TimedStrategyMixin
+
 
 # This class is a sample. Feel free to customize it.
-class SampleStrategy(IStrategy):
+class SampleStrategy(TimedStrategyMixin, IStrategy):
     """
     This is a sample strategy to inspire you.
     More information in https://www.freqtrade.io/en/latest/strategy-customization/
@@ -0,0 +1,10 @@
+# pragma pylint: disable=missing-docstring, invalid-name
+"""
+Helper modules of the strategies and hyperopts of this user data directory.
+
+They live outside of the strategies and hyperopts directories, whose modules are all loaded
+by the strategy / hyperopt resolvers, and are imported as a package: the user data directory
+is on the PYTHONPATH of the freqtrade container (see docker-compose.yml).
+
+    from strategy_helpers.bbrsi_indicators import add_bollinger_bands
+"""
@@ -0,0 +1,178 @@
+# pragma pylint: disable=missing-docstring, invalid-name
+"""
+Incremental RSI and Bollinger bands for the BBRSI strategies in live / dry-run.
+
+The bot analyzes the whole dataframe of each pair at every loop while only the last candles
+are new. IncrementalBBRSI keeps the indicators of the last dataframe of each pair and, when
+the new dataframe continues it, only computes the bands of the new candles.
+
+The values are the ones of IncrementalBBRSI.compute(), the full computation over the dataframe:
+- RSI: TA-Lib RSI over the dataframe, equal to ta.RSI. The Wilder averages depend on all the
+  candles since the first one of the dataframe, and the first candle moves at each new candle in
+  live (the dataframe is a sliding window of the exchange candle limit): the RSI is computed
+  again over the whole dataframe, in one vectorized call, whenever it has new candles or another
+  first candle. This part of the update is still O(n) in the dataframe length.
+- Bollinger bands of the typical price: mean and sample std of the window of each candle with
+  the numpy kernels of qtpylib (qtpylib.numpy_rolling_mean / numpy_rolling_std), and partial
+  windows on the first window - 1 candles. The value of a candle only depends on the candles of
+  its window: the known values are kept and only the new candles and the partial windows of the
+  start are computed, in O(window) per new candle.
+The indicators are computed again over the whole dataframe when it does not continue the
+state (missing candle, changed candle, different start).
+
+qtpylib.bollinger_bands (used by the backtests) computes the bands with the running sums of
+pandas rolling: the bands of compute() / update() differ from it by rounding, about 1e-13 of
+the price (e.g. 3e-9 on prices around 50000). The cost of update() is dominated by reading
+the columns and by the RSI: on 1000 candles it is not much faster than compute() (about 0.65
+against 0.75 ms), both being faster than ta.RSI + qtpylib.bollinger_bands (1.2-1.5 ms).
+
+Usage from a strategy:
+
+    from strategy_helpers.bbrsi_incremental import IncrementalBBRSI
+"""
+import math
+from typing import Dict, Sequence
+
+import numpy as np
+import talib
+from pandas import DataFrame
+
+from freqtrade.vendor.qtpylib.indicators import numpy_rolling_window
+
+OHLC_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+def typical_price(ohlc: np.ndarray) -> np.ndarray:
+    """Typical price of the rows of an open/high/low/close block, as qtpylib.typical_price."""
+    return (ohlc[1] + ohlc[2] + ohlc[3]) / 3.
+
+
+def window_mean_std(values: np.ndarray, window: int, start: int = 0, stop: int = None):
+    """
+    Mean and sample std of the window ending at each value of values[start:stop],
+    with partial windows on the first window - 1 values (pandas rolling with min_periods=1).
+    """
+    stop = len(values) if stop is None else stop
+    mean = np.empty(max(stop - start, 0))
+    std = np.empty(max(stop - start, 0))
+
+    if start < window - 1 and start < stop:
+        # Row i of the triangle holds the values of the partial window of i, padded with NaN.
+        # Always window - 1 wide: the sums of a row do not depend on start/stop
+        head = np.full(window - 1, np.nan)
+        head[:min(window - 1, len(values))] = values[:window - 1]
+        stop_head = min(window - 1, stop)
+        triangle = np.where(np.tri(window - 1, dtype=bool), head, np.nan)[start:stop_head]
+        counts = np.arange(start + 1, stop_head + 1)
+        head_mean = np.nansum(triangle, axis=1) / counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            head_std = np.sqrt(np.nansum((triangle - head_mean[:, None]) ** 2, axis=1) / (counts - 1))
+        head_std[counts == 1] = math.nan
+        mean[:len(head_mean)] = head_mean
+        std[:len(head_std)] = head_std
+
+    first_full = max(start, window - 1)
+    if first_full < stop:
+        windows = numpy_rolling_window(values[first_full - window + 1:stop], window)
+        mean[first_full - start:] = np.mean(windows, axis=-1)
+        std[first_full - start:] = np.std(windows, axis=-1, ddof=1)
+    return mean, std
+
+
+class _PairState:
+
+    def __init__(self, dates: np.ndarray, ohlc: np.ndarray, rsi: np.ndarray, mean: np.ndarray, std: np.ndarray):
+        # Candles of the last dataframe and their indicators
+        self.dates = dates
+        self.ohlc = ohlc
+        self.rsi = rsi
+        self.mean = mean
+        self.std = std
+        steps = np.diff(dates)
+        self.step = int(steps[steps > 0].min()) if (steps > 0).any() else 0
+
+
+class IncrementalBBRSI:
+    """
+    RSI and Bollinger bands of each pair, updated with the new candles of the dataframe only.
+    Columns: 'rsi', 'bb_middleband' and 'bb_lowerband_<k>sd' / 'bb_upperband_<k>sd' for each k of stds.
+    """
+
+    def __init__(self, rsi_period: int = 14, bb_window: int = 20, stds: Sequence[float] = (2,)):
+        self.rsi_period = rsi_period
+        self.bb_window = bb_window
+        self.stds = tuple(stds)
+        self.states: Dict[str, _PairState] = {}
+        self.full_computations = 0
+        self.updated_candles = 0
+
+    def compute(self, dataframe: DataFrame) -> Dict[str, np.ndarray]:
+        """Full computation over the dataframe, without state."""
+        dates, ohlc = self._arrays(dataframe)
+        return self._columns(self._compute(dates, ohlc))
+
+    def update(self, pair: str, dataframe: DataFrame) -> Dict[str, np.ndarray]:
+        """Indicators of the rows of the dataframe of the pair, computing only its new candles."""
+        dates, ohlc = self._arrays(dataframe)
+        state = self.states.get(pair)
+        start = self._continuation(state, dates, ohlc) if state is not None else None
+
+        if start is None:
+            # No usable state: full computation
+            state = self._compute(dates, ohlc)
+            self.full_computations += 1
+        else:
+            nb_known = len(state.dates) - start
+            typical = typical_price(ohlc)
+            # Partial windows of the start (they change when the first candle moves), known and new candles
+            head = min(self.bb_window - 1, nb_known)
+            head_mean, head_std = window_mean_std(typical, self.bb_window, 0, head)
+            new_mean, new_std = window_mean_std(typical, self.bb_window, nb_known)
+            mean = np.concatenate([head_mean, state.mean[start + head:], new_mean])
+            std = np.concatenate([head_std, state.std[start + head:], new_std])
+            rsi = (state.rsi if start == 0 and nb_known == len(dates)
+                   else talib.RSI(ohlc[3], timeperiod=self.rsi_period))
+            state = _PairState(dates, ohlc, rsi, mean, std)
+            self.updated_candles += len(dates) - nb_known
+        self.states[pair] = state
+
+        return self._columns(state)
+
+    def _compute(self, dates: np.ndarray, ohlc: np.ndarray) -> _PairState:
+        mean, std = window_mean_std(typical_price(ohlc), self.bb_window)
+        return _PairState(dates, ohlc, talib.RSI(ohlc[3], timeperiod=self.rsi_period), mean, std)
+
+    def _columns(self, state: _PairState) -> Dict[str, np.ndarray]:
+        columns = {'rsi': state.rsi, 'bb_middleband': state.mean}
+        for k in self.stds:
+            width = state.std * k
+            columns[f'bb_lowerband_{k}sd'] = state.mean - width
+            columns[f'bb_upperband_{k}sd'] = state.mean + width
+        return columns
+
+    @staticmethod
+    def _arrays(dataframe: DataFrame):
+        return (dataframe['date'].values.astype('datetime64[ns]').view(np.int64),
+                np.array([dataframe[column].to_numpy(dtype=np.float64) for column in OHLC_COLUMNS]))
+
+    @staticmethod
+    def _continuation(state: _PairState, dates: np.ndarray, ohlc: np.ndarray):
+        """
+        Index in the state of the first candle of the dataframe when the dataframe continues
+        the state (same known candles, then consecutive new candles), else None.
+        """
+        if not len(dates) or not len(state.dates):
+            return None
+        start = int(np.searchsorted(state.dates, dates[0]))
+        nb_known = len(state.dates) - start
+        if start == len(state.dates) or state.dates[start] != dates[0] or nb_known > len(dates):
+            return None
+        # Known candles unchanged (dates and open/high/low/close)
+        if (not np.array_equal(state.dates[start:], dates[:nb_known])
+                or not np.array_equal(state.ohlc[:, start:], ohlc[:, :nb_known])):
+            return None
+        # New candles without gap
+        new_dates = np.concatenate([state.dates[-1:], dates[nb_known:]])
+        if len(new_dates) > 1 and not (np.diff(new_dates) == state.step).all():
+            return None
+        return start
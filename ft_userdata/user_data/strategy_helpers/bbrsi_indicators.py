@@ -0,0 +1,60 @@
+# pragma pylint: disable=missing-docstring, invalid-name
+"""
+Indicators shared by the BBRSI strategies and hyperopts.
+
+Usage from a strategy or a hyperopt:
+
+    from strategy_helpers.bbrsi_indicators import add_bollinger_bands
+"""
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+
+def typical_price(dataframe: DataFrame) -> np.ndarray:
+    return ((dataframe['high'] + dataframe['low'] + dataframe['close']) / 3.).to_numpy(dtype=np.float64)
+
+
+def bollinger_bands(dataframe: DataFrame, window: int = 20, stds: Sequence[float] = (1, 2, 3, 4)) -> DataFrame:
+    """
+    Bollinger bands of the typical price for several standard deviation multiples.
+
+    The typical price, rolling mean and rolling std are computed once for all the multiples,
+    and the bands are written in one preallocated float64 block: the columns of the returned
+    frame are views into this block.
+    Gives the same values as qtpylib.bollinger_bands(qtpylib.typical_price(dataframe), window, k)
+    :return: DataFrame with the columns 'mid', 'lower_<k>sd' and 'upper_<k>sd' for each k of stds
+    """
+    rolling = pd.Series(typical_price(dataframe)).rolling(window=window, min_periods=1)
+    mid = rolling.mean().to_numpy()
+    std = rolling.std().to_numpy()
+
+    block = np.empty((1 + 2 * len(stds), len(dataframe)), dtype=np.float64)
+    columns = ['mid']
+    block[0] = mid
+    for i, k in enumerate(stds):
+        lower, upper = block[1 + 2 * i], block[2 + 2 * i]
+        np.multiply(std, k, out=upper)
+        np.subtract(mid, upper, out=lower)
+        np.add(mid, upper, out=upper)
+        columns += [f'lower_{k}sd', f'upper_{k}sd']
+
+    return DataFrame(block.T, index=dataframe.index, columns=columns, copy=False)
+
+
+def add_bollinger_bands(dataframe: DataFrame, window: int = 20,
+                        stds: Sequence[float] = (1, 2, 3, 4)) -> DataFrame:
+    """
+    Add the 'bb_lowerband_<k>sd', 'bb_middleband_<k>sd' and 'bb_upperband_<k>sd' columns
+    for each k of stds, computed in a single pass.
+    """
+    bands = bollinger_bands(dataframe, window=window, stds=stds)
+    mid = bands['mid'].to_numpy()
+    for k in stds:
+        dataframe[f'bb_lowerband_{k}sd'] = bands[f'lower_{k}sd'].to_numpy()
+        dataframe[f'bb_middleband_{k}sd'] = mid
+        dataframe[f'bb_upperband_{k}sd'] = bands[f'upper_{k}sd'].to_numpy()
+
+    return dataframe
@@ -0,0 +1,183 @@
+# pragma pylint: disable=missing-docstring, invalid-name
+"""
+Opt-in timing of the populate_* methods of a strategy, per pair and timeframe.
+
+TimedStrategyMixin wraps advise_indicators, advise_buy and advise_sell (which call
+populate_indicators, populate_buy_trend and populate_sell_trend) and records for each call
+the wall time, the number of rows and the allocated bytes. The p50 / p95 / p99 of each method
+are logged every `log_interval` seconds and at shutdown, where they are also dumped as JSON.
+
+It is disabled unless enabled in the config:
+
+    "strategy_timing": {
+        "enabled": true,
+        "log_interval": 300,
+        "trace_memory": false,
+        "export": "user_data/strategy_timing.json"
+    }
+
+Allocated bytes: with trace_memory, the peak of the memory allocated during the call
+(tracemalloc, which slows down all the allocations of the bot, Python >= 3.9), else the growth
+of the dataframe (new indicator / signal columns).
+
+Usage from a strategy:
+
+    from strategy_helpers.strategy_timing import TimedStrategyMixin
+
+    class MyStrategy(TimedStrategyMixin, IStrategy):
+"""
+import json
+import time
+import heapq
+import atexit
+import logging
+import tracemalloc
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+# Calls kept per method, pair and timeframe for the percentiles
+MAX_SAMPLES = 10000
+
+
+def _frame_bytes(dataframe: DataFrame) -> int:
+    return int(dataframe.memory_usage(index=True, deep=False).sum())
+
+
+class StrategyTimer:
+    """Wall time, rows and allocated bytes of the calls of each (method, pair, timeframe)."""
+
+    def __init__(self, strategy: str, trace_memory: bool = False, log_interval: float = 300.,
+                 export: str = None):
+        self.strategy = strategy
+        if trace_memory and not hasattr(tracemalloc, 'reset_peak'):
+            logger.warning("strategy_timing trace_memory needs Python >= 3.9, "
+                           "the growth of the dataframes is recorded instead")
+            trace_memory = False
+        self.trace_memory = trace_memory
+        self.log_interval = log_interval
+        self.export = export
+        self.samples: Dict[Tuple[str, str, str], deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+        self.calls: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.last_log = time.monotonic()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        atexit.register(self.shutdown)
+
+    def call(self, method: str, function, dataframe: DataFrame, metadata: dict, timeframe: str) -> DataFrame:
+        rows = len(dataframe)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        else:
+            before = _frame_bytes(dataframe)
+
+        start = time.perf_counter()
+        result = function(dataframe, metadata)
+        elapsed = time.perf_counter() - start
+
+        if self.trace_memory:
+            allocated = tracemalloc.get_traced_memory()[1] - before
+        else:
+            allocated = _frame_bytes(result) - before
+
+        key = (method, metadata.get('pair', ''), timeframe)
+        self.samples[key].append((elapsed, rows, allocated))
+        self.calls[key] += 1
+
+        if self.log_interval and time.monotonic() - self.last_log >= self.log_interval:
+            self.log()
+        return result
+
+    def summary(self) -> dict:
+        """{method: {pair: {timeframe: stats}}} of the recorded calls."""
+        summary = defaultdict(lambda: defaultdict(dict))
+        for (method, pair, timeframe), samples in self.samples.items():
+            elapsed, rows, allocated = (np.array(values) for values in zip(*samples))
+            stats = {'calls': self.calls[(method, pair, timeframe)],
+                     'total_s': float(elapsed.sum()),
+                     'rows_mean': float(rows.mean()),
+                     'bytes_mean': float(allocated.mean()),
+                     'bytes_max': int(allocated.max())}
+            for p, value in zip(PERCENTILES, np.percentile(elapsed, PERCENTILES)):
+                stats[f'p{p}_ms'] = float(value) * 1000
+            summary[method][pair][timeframe] = stats
+        return {method: {pair: dict(timeframes) for pair, timeframes in pairs.items()}
+                for method, pairs in summary.items()}
+
+    def method_summary(self) -> dict:
+        """Percentiles of each (method, timeframe) over all the pairs."""
+        grouped = defaultdict(list)
+        for (method, _, timeframe), samples in self.samples.items():
+            grouped[(method, timeframe)] += samples
+        summary = {}
+        for (method, timeframe), samples in sorted(grouped.items()):
+            elapsed = np.array([sample[0] for sample in samples])
+            summary[(method, timeframe)] = (len(samples), np.percentile(elapsed, PERCENTILES) * 1000)
+        return summary
+
+    def log(self):
+        self.last_log = time.monotonic()
+        for (method, timeframe), (calls, percentiles) in self.method_summary().items():
+            logger.info(f"{self.strategy} {method} {timeframe}: {calls} calls, "
+                        + ', '.join(f'p{p} {value:.2f} ms' for p, value in zip(PERCENTILES, percentiles)))
+
+        # p99 of each method, pair and timeframe, computed once for the ranking and the log
+        p99 = {key: np.percentile([sample[0] for sample in samples], 99) for key, samples in self.samples.items()}
+        for key in heapq.nlargest(5, p99, key=p99.get):
+            method, pair, timeframe = key
+            samples = self.samples[key]
+            logger.info(f"{self.strategy} slowest {method} {pair} {timeframe}: "
+                        f"p99 {p99[key] * 1000:.2f} ms, "
+                        f"{samples[-1][1]} rows, {samples[-1][2]} bytes")
+
+    def shutdown(self):
+        atexit.unregister(self.shutdown)
+        if not self.samples:
+            return
+        self.log()
+        if self.export:
+            Path(self.export).write_text(json.dumps({
+                'strategy': self.strategy,
+                'trace_memory': self.trace_memory,
+                'methods': self.summary(),
+            }, indent=2))
+            logger.info(f"{self.strategy} timings written to {self.export}")
+
+
+class TimedStrategyMixin:
+    """
+    Strategy mixin recording the timings of populate_indicators, populate_buy_trend and
+    populate_sell_trend when "strategy_timing" is enabled in the config.
+    Must come before IStrategy in the bases of the strategy.
+    """
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        timing = config.get('strategy_timing', {})
+        self.timer = None
+        if timing.get('enabled', False):
+            self.timer = StrategyTimer(self.__class__.__name__,
+                                       trace_memory=timing.get('trace_memory', False),
+                                       log_interval=timing.get('log_interval', 300),
+                                       export=timing.get('export'))
+
+    def _timed(self, method: str, function, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        if self.timer is None:
+            return function(dataframe, metadata)
+        return self.timer.call(method, function, dataframe, metadata, self.timeframe)
+
+    def advise_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        return self._timed('populate_indicators', super().advise_indicators, dataframe, metadata)
+
+    def advise_buy(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        return self._timed('populate_buy_trend', super().advise_buy, dataframe, metadata)
+
+    def advise_sell(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        return self._timed('populate_sell_trend', super().advise_sell, dataframe, metadata)
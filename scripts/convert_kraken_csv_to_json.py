@@ -5,12 +5,21 @@
 # 
 """
 Convert CSV OHLCVT data from Kraken to JSON freqtrade format
+(or to any other format supported by the freqtrade data handlers: jsongz, hdf5, feather, parquet)
+
+usage: convert_kraken_csv_to_json.py [-h] [-o OUTPUT] [-t TIMEFRAMES [TIMEFRAMES ...]]
+                                     [--data-format {json,jsongz,hdf5,feather,parquet}] [--benchmark]
+                                     [INPUT_DIR]
 """
 from typing import List, Dict
 
 import os
+import sys
+import time
 import pathlib
 import logging
+import argparse
+import tempfile
 import re
 
 import tqdm
@@ -18,29 +27,22 @@ import pandas as pd
 
 import ccxt
 
-from freqtrade.exchange import timeframe_to_minutes
 from freqtrade.data.history.idatahandler import get_datahandler
 from freqtrade.constants import DEFAULT_DATAFRAME_COLUMNS
 
+from ohlcv_resample import resample_ohlcv
+
 csv_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'trades']
+
+# jsongz is the compressed JSON format, hdf5/feather/parquet are compressed by the data handlers
+DATA_FORMATS = ['json', 'jsongz', 'hdf5', 'feather', 'parquet']
 #csv_columns = ['timestamp', 'price', 'amount']
 
 logger = logging.getLogger(__name__)
 
 def trades_to_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
-    timeframe_minutes = timeframe_to_minutes(timeframe)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True)
-    df = df.set_index('timestamp')
-    #df_new = df['price'].resample(f'{timeframe_minutes}min').ohlc()
-    df_new['open'] = df['open'].resample(f'{timeframe_minutes}min')
-    df_new['high'] = df['high'].resample(f'{timeframe_minutes}min')
-    df_new['low'] = df['low'].resample(f'{timeframe_minutes}min')
-    df_new['close'] = df['close'].resample(f'{timeframe_minutes}min')
-    df_new['volume'] = df['volume'].resample(f'{timeframe_minutes}min').sum()
-    df_new['date'] = df_new.index
-    # Drop 0 volume rows
-    df_new = df_new.dropna()
-    return df_new.loc[:, DEFAULT_DATAFRAME_COLUMNS]
+    # Periods without candles (0 volume) are not generated
+    return resample_ohlcv(df, [timeframe])[timeframe].loc[:, DEFAULT_DATAFRAME_COLUMNS]
 
 
 def convert_trades_to_ohlcv(pairs: Dict[str, pathlib.Path], timeframes: List[str],
@@ -50,15 +52,44 @@ def convert_trades_to_ohlcv(pairs: Dict[str, pathlib.Path], timeframes: List[str
 
     for pair, csv_file_path in tqdm.tqdm(pairs.items()):
         trades_df = pd.read_csv(csv_file_path, names=csv_columns, header=None)
-        for timeframe in timeframes:
+        try:
+            # All the timeframes in one pass, the coarser ones derived from the finer ones
+            ohlcvs = resample_ohlcv(trades_df, timeframes)
+        except ValueError:
+            logger.exception(f'Could not convert {pair} to OHLCV.')
+            continue
+        for timeframe, ohlcv in ohlcvs.items():
             try:
-                ohlcv = trades_to_ohlcv(trades_df, timeframe)
                 # Store ohlcv
-                data_handler_ohlcv.ohlcv_store(pair, timeframe, data=ohlcv)
+                data_handler_ohlcv.ohlcv_store(pair, timeframe, data=ohlcv.loc[:, DEFAULT_DATAFRAME_COLUMNS])
             except ValueError:
                 logger.exception(f'Could not convert {pair} to OHLCV.')
 
 
+def benchmark_load(pairs: List[str], timeframes: List[str], datadir: pathlib.Path,
+                   data_format_ohlcv: str = 'json') -> None:
+    """Compare the load time of the stored candles with the JSON format."""
+    data_handler_ohlcv = get_datahandler(datadir, data_format=data_format_ohlcv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_data_handler = get_datahandler(pathlib.Path(tmp_dir), data_format='json')
+        for pair in pairs:
+            for timeframe in timeframes:
+                start = time.perf_counter()
+                ohlcv = data_handler_ohlcv.ohlcv_load(pair, timeframe)
+                load_time = time.perf_counter() - start
+                if ohlcv.empty:
+                    continue
+
+                json_data_handler.ohlcv_store(pair, timeframe, data=ohlcv)
+                start = time.perf_counter()
+                json_data_handler.ohlcv_load(pair, timeframe)
+                json_load_time = time.perf_counter() - start
+
+                print(f"{pair} {timeframe}: {data_format_ohlcv} load {load_time * 1000:.1f} ms, "
+                      f"json load {json_load_time * 1000:.1f} ms (x{json_load_time / max(load_time, 1e-9):.1f})")
+
+
 def get_kraken_currency_alt_names():
     kraken = ccxt.kraken()
     currencies = kraken.fetchCurrencies()
@@ -85,10 +116,27 @@ def get_kraken_pairs(kraken_csv_dir: pathlib.Path):
     return pairs
 
 
-if __name__ == '__main__':
-    kraken_csv_dir = pathlib.Path("~/Downloads/Kraken_Trading_History").expanduser()
+def main(argv):
+    parser = argparse.ArgumentParser(description='Convert CSV OHLCVT data from Kraken to freqtrade format.')
+    parser.add_argument('input_dir', metavar='INPUT_DIR', type=str, nargs='?', default='~/Downloads/Kraken_Trading_History', help='Directory of the Kraken CSV files (Default: ~/Downloads/Kraken_Trading_History)')
+    parser.add_argument('-o', '--output', default='ohlcv', help='Output data directory (Default: ohlcv)')
+    parser.add_argument('-t', '--timeframes', nargs='+', default=["1m", "5m"], help='Timeframes to generate (Default: 1m 5m)')
+    parser.add_argument('--data-format', default='json', choices=DATA_FORMATS, help='Output format (Default: json)')
+    parser.add_argument('--benchmark', action='store_true', help='Compare the load time of the written files with the JSON format')
+
+    args = parser.parse_args(argv)
+
+    kraken_csv_dir = pathlib.Path(args.input_dir).expanduser()
+    datadir = pathlib.Path(args.output)
     pairs = get_kraken_pairs(kraken_csv_dir)
     print(f"All pairs: {pairs.keys()}")
     convert_trades_to_ohlcv(
-        pairs=pairs, timeframes=["1m", "5m"], 
-        datadir=pathlib.Path("ohlcv"))
+        pairs=pairs, timeframes=args.timeframes,
+        datadir=datadir, data_format_ohlcv=args.data_format)
+
+    if args.benchmark:
+        benchmark_load(list(pairs.keys()), args.timeframes, datadir, args.data_format)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,5 +1,8 @@
 #!/bin/bash
 # Execute hyperopt with different configuration and extract all results in a CSV file
+#
+# All the combinations run in a single container with hyperopt_sweep.py: the candle data
+# and the strategy are loaded once per timeframe and the loss functions run in parallel.
 
 allTimeframe=("5m" "15m" "1h" "1d")
 
@@ -9,12 +12,10 @@ allStrategy=("BBRSINaiveStrategyWithHyperoptCode")
 
 numberOfEpochs="100"
 
-for strategy in "${allStrategy[@]}"; do
-    for lossFunction in "${allLossFunctions[@]}"; do
-        for timeframe in "${allTimeframe[@]}"; do
-            echo "$strategy $lossFunction $timeframe"
-            sudo docker-compose run --rm freqtrade hyperopt --print-json --hyperopt-loss $lossFunction --strategy $strategy -i $timeframe -e $numberOfEpochs > tmp.log
-            ./extract_hyperopt_result.py -i tmp.log -l $lossFunction -s $strategy -t $timeframe
-        done
-    done
-done
+sudo docker-compose run --rm -v "$(pwd):/sweep" --entrypoint python3 freqtrade /sweep/hyperopt_sweep.py \
+    --config user_data/config.json \
+    --strategy "${allStrategy[@]}" \
+    --loss "${allLossFunctions[@]}" \
+    --timeframe "${allTimeframe[@]}" \
+    -e $numberOfEpochs \
+    -o /sweep/hyperopt_res.csv
@@ -1,31 +1,136 @@
 #!/usr/bin/env python3
-# Extract all pickle hyperopt result in a CSV file
+# Extract all hyperopt results (.pickle or .fthypt files) in a CSV file
+#
+# The result files are read directly (no hyperopt-show run per file), by a pool of worker
+# processes with -j. The rows are written to the CSV file in batches by a single writer,
+# under a file lock: several extractions can write to the same CSV file at the same time.
+#
+# usage: extract_all_hyperopt_results.py [-h] [-o OUTPUT] [--best] [-s STRATEGIE] [-l LOSSFUNCTION]
+#                                        [-t TIMEFRAME] [-j JOBS] [-b BATCH_SIZE] [INPUT_PATH]
 
 import re
 import os
 import sys
+import json
+import pickle
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extract_hyperopt_result import EXPLANATION_PATTERN, write_rows
+
+RESULT_FILE_PATTERN = re.compile(r'.*\.(pickle|fthypt)$')
+
+# Name of the result files written by hyperopt_sweep.py
+SWEEP_FILE_PATTERN = re.compile(
+    r'hyperopt_results_(?P<strategie>[^_]+)_(?P<lossFunction>[^_]+)_(?P<timeframe>[^_]+)_\d{4}-\d{2}-\d{2}_')
+
+PARAMS_SPACES = ['buy', 'sell']
+
+
+def load_epochs(result_file):
+    """Load all the epochs of a hyperopt result file."""
+    if result_file.endswith('.pickle'):
+        try:
+            import joblib
+            return joblib.load(result_file)
+        except ImportError:
+            with open(result_file, 'rb') as input_file:
+                return pickle.load(input_file)
+
+    # .fthypt: one JSON epoch per line
+    with open(result_file, 'r') as input_file:
+        return [json.loads(line) for line in input_file if line.strip()]
+
+
+def epoch_row(epoch, nb_epoch):
+    """CSV row of an epoch, with the columns of extract_hyperopt_result.py."""
+    result = EXPLANATION_PATTERN.search(epoch['results_explanation'])
+    if result is None:
+        return None
+
+    row = {'epoch': str(epoch['current_epoch']), 'nb_epoch': str(nb_epoch)}
+    row.update(result.groupdict())
+    row['objective'] = f"{epoch['loss']:.5f}"
+
+    # Same params as the "params" of hyperopt-show --print-json (buy and sell spaces)
+    details = epoch.get('params_details', {})
+    if any(space in details for space in PARAMS_SPACES):
+        for space in PARAMS_SPACES:
+            row.update(details.get(space, {}))
+    else:
+        row.update(epoch.get('params_dict', {}))
+    return row
+
+
+def extract_file(result_file, best=False, strategie=None, loss_function=None, timeframe=None):
+    """CSV rows of all the epochs (or only the best one) of a result file."""
+    epochs = load_epochs(result_file)
+    nb_epoch = max((epoch['current_epoch'] for epoch in epochs), default=0)
+    if best and epochs:
+        epochs = [min(epochs, key=lambda epoch: epoch['loss'])]
+
+    # Run description from the name of the files written by hyperopt_sweep.py, unless given
+    description = {}
+    sweep_file = SWEEP_FILE_PATTERN.match(os.path.basename(result_file))
+    if sweep_file:
+        description.update(sweep_file.groupdict())
+    for key, value in [('strategie', strategie), ('lossFunction', loss_function), ('timeframe', timeframe)]:
+        if value:
+            description[key] = value
+
+    rows = []
+    for epoch in epochs:
+        row = epoch_row(epoch, nb_epoch)
+        if row is not None:
+            row.update(description)
+            rows.append(row)
+    return rows
 
-def hyperopt_show(pickle_file):
-    cmd = "sudo docker-compose run --rm freqtrade hyperopt-show --print-json --best --hyperopt-filename " + pickle_file + " > tmp.log"
-    os.system(cmd)
-    cmd = "./extract_hyperopt_result.py -i tmp.log"
-    os.system(cmd)
 
 def main(argv):
     parser = argparse.ArgumentParser(description='Extract all hyperopt results from pickle files.')
     parser.add_argument('input_path', metavar='INPUT_PATH', type=str, nargs='?', default='.', help='Path to the input file or directory (Default: current directory)')
+    parser.add_argument('-o', '--output', default='./hyperopt_res.csv', help='Output file (CSV, or SQLite results store if .sqlite/.db)')
+    parser.add_argument('--best', action='store_true', help='Only extract the best epoch of each file')
+    parser.add_argument('-s', '--strategie', help='Used strategie')
+    parser.add_argument('-l', '--lossFunction', help='Used loss function')
+    parser.add_argument('-t', '--timeframe', help='Used timeframe')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of files read in parallel (Default: 1)')
+    parser.add_argument('-b', '--batch-size', type=int, default=10000, help='Number of rows written at once (Default: 10000)')
+
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
-    
     # If directory => Manage all files
     if os.path.isdir(args.input_path):
-        for pickle_file in os.listdir(args.input_path):
-            if re.findall('.*\.pickle', pickle_file):
-                hyperopt_show(pickle_file)
+        result_files = [os.path.join(args.input_path, result_file)
+                        for result_file in sorted(os.listdir(args.input_path))
+                        if RESULT_FILE_PATTERN.match(result_file)]
     else:
-        hyperopt_show(args.input_path)
+        result_files = [args.input_path]
+
+    rows = []
+    nb_rows = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            executor.submit(extract_file, result_file, args.best, args.strategie, args.lossFunction, args.timeframe):
+                result_file
+            for result_file in result_files
+        }
+        for future in as_completed(futures):
+            try:
+                rows += future.result()
+            except (OSError, ValueError, KeyError, pickle.UnpicklingError) as e:
+                print(f"{futures[future]}: {e}", file=sys.stderr)
+                continue
+
+            if len(rows) >= args.batch_size:
+                write_rows(rows, args.output)
+                nb_rows += len(rows)
+                rows = []
+
+    write_rows(rows, args.output)
+    nb_rows += len(rows)
+    print(f"{nb_rows} epochs of {len(result_files)} files written to {args.output}")
 
 if __name__ == "__main__":
     main(sys.argv[1:])
-
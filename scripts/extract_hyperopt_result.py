@@ -2,65 +2,270 @@
 #
 # Extract hyperopt result and put it in a CSV file.
 #
-# usage: extract_hyperopt_result.py [-h] [-i INPUT] [-o OUTPUT]
+# usage: extract_hyperopt_result.py [-h] [-i INPUT] [-o OUTPUT] [-s STRATEGIE] [-l LOSSFUNCTION]
+#                                   [-t TIMEFRAME] [--benchmark]
+#
+# With --benchmark, measure the parsing throughput on the input (Default: a generated log, whose
+# values are checked) against the former regex search of each line.
 
 import re
 import json
 import csv
+import fcntl
+import time
+import random
 import argparse
 import sys
 import os
 import select
+import logging
+
+from hyperopt_results_store import ResultsStore, is_store
+
+logger = logging.getLogger(__name__)
+
+# Results explanation of an epoch, as written by freqtrade
+EXPLANATION_REGEX = (
+    r'(?P<trades>[0-9]+) trades\. +(?P<wins>[0-9]+)/(?P<draws>[0-9]+)/(?P<losses>[0-9]+) Wins/Draws/Losses\. +'
+    r'Avg profit +(?P<avg_profit>-?[0-9]+\.[0-9]+)%\. +Median profit +(?P<median_profit>-?[0-9]+\.[0-9]+)%\. +'
+    r'Total profit +(?P<total_profit>-?[0-9]+\.[0-9]+) +(?P<profit_unit>[A-Z]+) +'
+    r'\( *(?P<profit_percent>-?[0-9]+\.[0-9]+)Σ%\)\. +Avg duration +(?P<avg_duration>.+?) +min')
+
+EXPLANATION_PATTERN = re.compile(EXPLANATION_REGEX)
+
+# Epoch line of the hyperopt output: "   7/100:     21 trades. [...] min. Objective: -1.23456"
+EPOCH_PATTERN = re.compile(
+    r'(?P<epoch>[0-9]+)/(?P<nb_epoch>[0-9]+): +' + EXPLANATION_REGEX + r'\. +Objective: +(?P<objective>-?[0-9]+\.[0-9]+)')
+
+EPOCH_MARKER = 'Wins/Draws/Losses'
+PARAMS_MARKER = '{"params"'
+
+FIELD_TYPES = {
+    'epoch': int, 'nb_epoch': int, 'trades': int, 'wins': int, 'draws': int, 'losses': int,
+    'avg_profit': float, 'median_profit': float, 'total_profit': float, 'profit_unit': str,
+    'profit_percent': float, 'avg_duration': str, 'objective': float,
+}
+
+
+def _iter_lines(input_file):
+    """Yield ('epoch', match) for the epoch lines and ('params', dict) for the params lines."""
+    for line in input_file:
+        # Cheap substring checks first: most lines of a log are neither
+        if EPOCH_MARKER in line:
+            result = EPOCH_PATTERN.search(line)
+            if result is not None:
+                yield 'epoch', result
+        elif PARAMS_MARKER in line:
+            yield 'params', json.loads(line)['params']
+
+
+def _typed(result):
+    record = {name: FIELD_TYPES[name](value) for name, value in result.groupdict().items()}
+    try:
+        record['avg_duration'] = float(record['avg_duration'])
+    except ValueError:
+        # h:mm:ss duration of the recent freqtrade versions
+        pass
+    return record
+
+
+def iter_epochs(input_file):
+    """
+    Parse a hyperopt output (e.g. run with --print-all) in a single pass.
+    Yield a typed record per epoch line, with the params printed after it in 'params' (None if not printed).
+    """
+    pending = None
+    for kind, value in _iter_lines(input_file):
+        if kind == 'epoch':
+            if pending is not None:
+                yield pending
+            pending = _typed(value)
+            pending['params'] = None
+        elif pending is not None:
+            pending['params'] = value
+            yield pending
+            pending = None
+
+    if pending is not None:
+        yield pending
+
 
 def extract(input_file):
+    """Last epoch line before the first params of the hyperopt output, with these params."""
+    dict_data = None
+    for kind, value in _iter_lines(input_file):
+        if kind == 'epoch':
+            dict_data = value.groupdict()
+        else:
+            # Get the params part in json format
+            if dict_data is not None:
+                dict_data.update(value)
+                return dict_data
+            break
+
+    sys.exit('Expected input not found...')
+
+def convert(dict_data, csv_file_name):
+    write_rows([dict_data], csv_file_name)
+
+def write_rows(rows, csv_file_name, skip_existing=False):
+    """
+    Write rows to the CSV file in one batch (with a header if the file is new).
+    The file is locked while writing: several extractions can write to the same file.
+    Rows with columns which are not in the file yet make it rewritten with all the columns.
+    Rows written to a .sqlite or .db file go to a results store (see hyperopt_results_store.py).
+    With skip_existing, the rows already in the file are not written again (extraction retried).
+    """
+    if not rows:
+        return
+
+    if is_store(csv_file_name):
+        with ResultsStore(csv_file_name) as store:
+            store.add_rows(rows, skip_existing)
+        return
+
+    with open(csv_file_name, 'a+') as csv_file:
+        fcntl.flock(csv_file, fcntl.LOCK_EX)
+        try:
+            csv_file.seek(0)
+            header = csv_file.readline()
+            fieldnames = next(csv.reader([header])) if header else []
+            if skip_existing and fieldnames:
+                existing = {tuple(line) for line in csv.reader(csv_file)}
+                rows = [row for row in rows if tuple('' if row.get(name) is None else str(row[name])
+                                                     for name in fieldnames) not in existing]
+            # Columns of the rows which are not in the file yet, in order of appearance
+            new_fieldnames = [key for key in dict.fromkeys(key for row in rows for key in row)
+                              if key not in fieldnames]
+            if fieldnames and new_fieldnames:
+                # Other params (another strategy or other spaces): the file is written again with
+                # all the columns, empty for the previous rows. Still locked, so nothing is lost
+                logger.warning(f"New columns in {csv_file_name}: {', '.join(new_fieldnames)}, rewriting it "
+                               f"(a .sqlite results store keeps the params of all the runs without rewriting)")
+                csv_file.seek(0)
+                previous_rows = list(csv.DictReader(csv_file))
+                csv_file.seek(0)
+                csv_file.truncate()
+                writer = csv.DictWriter(csv_file, fieldnames=fieldnames + new_fieldnames)
+                writer.writeheader()
+                writer.writerows(previous_rows)
+            elif fieldnames:
+                # Add lines with the columns of the existing file
+                writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+            else:
+                # Create file with header: columns of all the rows, in order of appearance
+                writer = csv.DictWriter(csv_file, fieldnames=new_fieldnames)
+                writer.writeheader()
+            writer.writerows(rows)
+            csv_file.flush()
+        finally:
+            fcntl.flock(csv_file, fcntl.LOCK_UN)
+
+def reference_extract(input_file):
+    """
+    Former implementation (uncompiled regex search of each line), for the throughput comparison
+    only: its greedy pattern cuts the sign and leading digits of the profits.
+    """
     pattern = "^.* +([0-9]+)\/([0-9]+): +([0-9]+).+\. +([0-9]+)\/([0-9]+)\/([0-9]+) +.+(-?[0-9]+\.[0-9]+)%\. +Median.+(-?[0-9]+\.[0-9]+)%\. +.+ +(-?[0-9]+\.[0-9]+) +([A-Z]+) +\( +(-?[0-9]+\.[0-9]+)Σ%\)\. +.+ +([0-9]+\.?[0-9]*) +.+: +(-?[0-9]+\.[0-9]+)"
     columns = ['all','epoch','nb_epoch','trades','wins','draws','losses','avg_profit','median_profit','total_profit', 'profit_unit', 'profit_percent','avg_duration','objective']
 
-    # Read hyperopt result
+    dict_data = None
     for line in input_file:
         if re.search("Wins/Draws/Losses", line):
             result = re.match(pattern, line)
-            if result != None: 
+            if result != None:
                 dict_data = {col_name:result.group(n) for n, col_name in enumerate(columns) }
-                
-                # Remove 1st column
                 dict_data.pop('all')
-
-        # Get the params part in json format
         elif re.search("{\"params\"", line):
-            json_param = json.loads(line)
+            dict_data.update(json.loads(line)['params'])
             break
+    return dict_data
 
-    if 'dict_data' in locals() and 'json_param' in locals() :
-        dict_data.update(json_param['params'])
-        
-        return dict_data
-    else:
-       sys.exit('Expected input not found...') 
+def generate_log(nb_epoch=100000):
+    """
+    Lines of a hyperopt --print-all --print-json output, and the values of its epochs as extract()
+    returns them. The profits and objectives are positive or negative, the last epoch (the one of
+    extract) has negative ones.
+    """
+    rng = random.Random(0)
+    lines = []
+    epochs = []
+    for epoch in range(1, nb_epoch + 1):
+        trades = rng.randint(1, 500)
+        wins = rng.randint(0, trades)
+        sign = -1 if epoch == nb_epoch else 1
+        values = {
+            'epoch': str(epoch), 'nb_epoch': str(nb_epoch), 'trades': str(trades),
+            'wins': str(wins), 'draws': '0', 'losses': str(trades - wins),
+            'avg_profit': f"{-abs(rng.uniform(-50, 50)) if sign < 0 else rng.uniform(-50, 50):.2f}",
+            'median_profit': f"{-abs(rng.uniform(-50, 50)) if sign < 0 else rng.uniform(-50, 50):.2f}",
+            'total_profit': f"{-abs(rng.uniform(-100, 100)) if sign < 0 else rng.uniform(-100, 100):.8f}",
+            'profit_unit': 'USDT',
+            'profit_percent': f"{-abs(rng.uniform(-10, 10)) if sign < 0 else rng.uniform(-10, 10):.2f}",
+            'avg_duration': f"{rng.uniform(5, 5000):.1f}",
+            'objective': f"{-abs(rng.uniform(-10, 10)) if sign < 0 else rng.uniform(-10, 10):.5f}",
+        }
+        lines.append(f"{'*' if epoch % 97 == 0 else ' '} {epoch:5d}/{nb_epoch}: {trades:6d} trades. "
+                     f"{wins}/0/{trades - wins} Wins/Draws/Losses. Avg profit {float(values['avg_profit']): 6.2f}%. "
+                     f"Median profit {float(values['median_profit']): 6.2f}%. "
+                     f"Total profit {float(values['total_profit']): 11.8f} USDT "
+                     f"({float(values['profit_percent']): 7.2f}Σ%). Avg duration {values['avg_duration']:>5} min. "
+                     f"Objective: {values['objective']}\n")
+        epochs.append(values)
+    params = {'rsi-enabled': True, 'rsi-value': 20}
+    lines.append(json.dumps({'params': params}) + '\n')
+    return lines, epochs, params
 
-def convert(dict_data, csv_file_name):
+def benchmark(lines, epochs=None, params=None):
+    """Parsing throughput, and results checked against the generated values when given."""
+    size = sum(len(line.encode()) for line in lines) / 1024 ** 2
 
-    if not os.path.isfile(csv_file_name):
-        # Create file with header
-        with open(csv_file_name, 'w') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=dict_data.keys())
-            writer.writeheader()
-            writer.writerow(dict_data)
-    else:
-        # Add a line
-        with open(csv_file_name, 'a') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=dict_data.keys())
-            writer.writerow(dict_data)
+    start = time.perf_counter()
+    reference_extract(lines)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dict_data = extract(lines)
+    extract_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    records = list(iter_epochs(lines))
+    iter_time = time.perf_counter() - start
+
+    extract_check = iter_check = ''
+    if epochs is not None:
+        extract_check = ', correct result' if dict_data == {**epochs[-1], **params} else ', WRONG result'
+        expected = [{name: FIELD_TYPES[name](value) for name, value in values.items()} for values in epochs]
+        for record in expected:
+            record['avg_duration'] = float(record['avg_duration'])
+            record['params'] = None
+        expected[-1]['params'] = params
+        iter_check = ', correct records' if records == expected else ', WRONG records'
+
+    print(f"{len(lines)} lines ({size:.1f} MB), {len(records)} epochs")
+    print(f"former extract: {reference_time:.2f}s ({size / reference_time:.1f} MB/s)")
+    print(f"extract:        {extract_time:.2f}s ({size / extract_time:.1f} MB/s){extract_check}")
+    print(f"iter_epochs:    {iter_time:.2f}s ({size / iter_time:.1f} MB/s, {len(records) / iter_time:.0f} epochs/s)"
+          f"{iter_check}")
 
 def main(argv):
     parser = argparse.ArgumentParser(description='Extract hyperopt result and put it in a CSV file.')
     parser.add_argument('-i', '--input', help='Input file (Default: stdin)')
-    parser.add_argument('-o', '--output', default='./hyperopt_res.csv', help='Output file')
+    parser.add_argument('-o', '--output', default='./hyperopt_res.csv', help='Output file (CSV, or SQLite results store if .sqlite/.db)')
     parser.add_argument('-s', '--strategie', help='Used strategie')
     parser.add_argument('-l', '--lossFunction', help='Used loss function')
     parser.add_argument('-t', '--timeframe', help='Used timeframe')
+    parser.add_argument('--benchmark', action='store_true', help='Measure the parsing throughput instead of extracting')
+
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
+    if args.benchmark:
+        if args.input:
+            with open(args.input, 'r') as input_file:
+                benchmark(input_file.readlines())
+        else:
+            benchmark(*generate_log())
+        return
 
     if args.input:
         if os.path.isfile(args.input):
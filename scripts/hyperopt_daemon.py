@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+#
+# Long-lived hyperopt daemon running the jobs of hyperopt_sweep.py --daemon SOCKET.
+#
+# Each hyperopt of a sweep otherwise pays again the imports (freqtrade, pandas, talib, the
+# strategy), the exchange and markets loading, the loading of the candles, the population of
+# the indicators and the dump of the frames. The daemon keeps a warm pool per strategy /
+# timeframe / config: the Backtesting is built, the candles loaded, the indicators populated
+# and the frames of the epochs dumped once in the daemon, then the pool workers are forked
+# from it and run the hyperopts of the jobs on copies of this Backtesting and on these frames.
+# The pools stay alive between the sweeps, so back-to-back sweeps of the same strategies and
+# timeframes start their epochs right away. Each job still builds its configuration from the
+# config files, loads its hyperopt and loss function classes and starts its optimizer.
+#
+# The pairs and the timerange come from the config files: a pool is rebuilt when they, the
+# code of the strategies, hyperopts and helper modules or the candle files change, and the
+# previous pool of the strategy/timeframe is closed. The least recently used pools are closed
+# beyond --max-pools.
+# The requests are JSON lines on a Unix socket, the daemon must run in the same directory as
+# the sweeps (the config and data paths are relative to it). The requests are read by the
+# threads of the server, but the pools are only handled by the main thread: their workers are
+# forked from it, never from a request thread which could hold locks the workers would need.
+#
+# Must be run with the freqtrade environment available, e.g. from the ft_userdata directory:
+#   sudo docker-compose run --rm -v "$(pwd):/sweep" --entrypoint python3 freqtrade /sweep/hyperopt_daemon.py
+#
+# usage: hyperopt_daemon.py [-h] [-S SOCKET] [-j JOBS] [--max-pools MAX_POOLS] [{serve,status,stop}]
+
+import os
+import sys
+import glob
+import json
+import time
+import queue
+import hashlib
+import logging
+import argparse
+import threading
+import socketserver
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from joblib import dump
+
+from freqtrade.data.converter import trim_dataframes
+from freqtrade.data.history import get_timerange
+from freqtrade.optimize.backtesting import Backtesting
+
+from hyperopt_sweep import (_populated, _preloaded, _prepared, build_config, daemon_request, populate_frames,
+                            run_hyperopt_job)
+from ohlcv_store import OHLCVStore, load_bt_data
+
+DEFAULT_SOCKET = 'user_data/hyperopt_daemon.sock'
+
+logger = logging.getLogger(__name__)
+
+# Candles, populated frames and prepared Backtesting of the pools, inherited by the forked workers.
+# pool key -> (data, timerange, populated, (backtesting, data pickle file, min date, max date))
+_warm = {}
+
+
+def pool_key(args, strategy, timeframe):
+    """
+    Key of the pool of a strategy/timeframe: changes with the config files, the code of the
+    strategies, hyperopts and their helper modules, and the candles (modification times of the
+    data files of the timeframe or of the store files).
+    """
+    digest = hashlib.sha1()
+    for part in [strategy, timeframe, args.userdir, args.ohlcv_store or '']:
+        digest.update(f"{part}\0".encode())
+    sources = sorted(args.config)
+    for directory in ['strategies', 'hyperopts', 'strategy_helpers']:
+        sources += sorted(glob.glob(os.path.join(args.userdir, directory, '*.py')))
+    for path in sources:
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    data_dir = args.ohlcv_store or os.path.join(args.userdir, 'data')
+    # Data files are named PAIR-TIMEFRAME.EXT: only the ones of the timeframe are checked
+    pattern = '*' if args.ohlcv_store else f'*-{timeframe}.*'
+    for path in sorted(glob.glob(os.path.join(data_dir, '**', pattern), recursive=True)):
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    return digest.hexdigest()
+
+
+def run_warm_job(key, args, strategy, loss_function, timeframe, hyperopt_jobs, epochs, previous_results, rung):
+    """Run one hyperopt in a pool worker, on the frames populated by the daemon."""
+    data, timerange, populated, prepared = _warm[key]
+    _preloaded[(strategy, timeframe)] = (data, timerange)
+    _populated[(strategy, timeframe)] = populated
+    _prepared[(strategy, timeframe)] = prepared
+    return run_hyperopt_job(args, strategy, loss_function, timeframe, hyperopt_jobs, epochs,
+                            previous_results, rung)
+
+
+class WarmPool:
+    """
+    Workers forked after the candles of a strategy/timeframe are loaded and populated.
+    The Backtesting (exchange, markets, pairlist, strategy) is built once, and the frames
+    trimmed and dumped once, for all the hyperopts of the jobs (see prepared_hyperopt).
+    """
+
+    def __init__(self, key, args, strategy, timeframe, nb_workers):
+        start = time.time()
+        self.key = key
+        self.strategy = strategy
+        self.timeframe = timeframe
+
+        config = build_config(args, strategy, timeframe)
+        backtesting = Backtesting(config)
+        backtesting._set_strategy(backtesting.strategylist[0])
+        if args.ohlcv_store:
+            data, timerange = load_bt_data(OHLCVStore(args.ohlcv_store), backtesting)
+        else:
+            data, timerange = backtesting.load_bt_data()
+        populated = populate_frames(backtesting.strategy, data)
+
+        # Frames of the epochs, as each hyperopt would dump them at its start
+        processed = trim_dataframes(populated, timerange, backtesting.required_startup)
+        min_date, max_date = get_timerange(processed)
+        self.data_pickle_file = (Path(config['user_data_dir']) / 'hyperopt_results' /
+                                 f'hyperopt_daemon_{key[:16]}.pkl')
+        dump(processed, self.data_pickle_file)
+        _warm[key] = (data, timerange, populated, (backtesting, self.data_pickle_file, min_date, max_date))
+
+        self.pairs = list(data)
+        self.warmup = time.time() - start
+        self.jobs = 0
+        self.executor = ProcessPoolExecutor(max_workers=nb_workers, mp_context=multiprocessing.get_context('fork'))
+        # Fork all the workers now, in the thread creating the pool
+        wait([self.executor.submit(os.getpid) for _ in range(nb_workers)])
+
+    def submit(self, args, loss_function, hyperopt_jobs, epochs, previous_results, rung):
+        self.jobs += 1
+        return self.executor.submit(run_warm_job, self.key, args, self.strategy, loss_function, self.timeframe,
+                                    hyperopt_jobs, epochs, previous_results, rung)
+
+    def close(self):
+        # The running jobs finish in their workers, which have their own copy of the frames.
+        # Their epochs still read the data pickle: it is removed once they are done
+        self.executor.shutdown(wait=False)
+        del _warm[self.key]
+        threading.Thread(target=self._remove_data_pickle, daemon=True).start()
+
+    def _remove_data_pickle(self):
+        self.executor.shutdown(wait=True)
+        if self.data_pickle_file.exists():
+            os.remove(self.data_pickle_file)
+
+
+class HyperoptDaemon:
+    """Warm pools of the daemon. The pools are only handled in the main thread, see serve_calls."""
+
+    def __init__(self, nb_workers, max_pools):
+        self.nb_workers = nb_workers
+        self.max_pools = max_pools
+        self.pools = OrderedDict()
+        self.calls = queue.Queue()
+
+    def call(self, method, *args):
+        """Run a method in the main thread and wait for its result (from a request thread)."""
+        future = Future()
+        self.calls.put((future, method, args))
+        return future.result()
+
+    def serve_calls(self):
+        """Run the calls of the request threads until stop()."""
+        for future, method, args in iter(self.calls.get, None):
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(method(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def stop(self):
+        self.calls.put(None)
+
+    def submit(self, args, request):
+        """Submit a job to the pool of its strategy/timeframe, started if needed."""
+        strategy, timeframe = request['strategy'], request['timeframe']
+        key = pool_key(args, strategy, timeframe)
+        pool = self.pools.get(key)
+        if pool is None:
+            # Pools of the same strategy/timeframe on previous code, config or candles
+            for stale in [other for other in self.pools.values()
+                          if (other.strategy, other.timeframe) == (strategy, timeframe)]:
+                logger.info(f"Closing the outdated {strategy} {timeframe} pool")
+                self.discard(stale)
+            logger.info(f"Loading {strategy} {timeframe} data")
+            pool = WarmPool(key, args, strategy, timeframe, self.nb_workers)
+            logger.info(f"{strategy} {timeframe}: {len(pool.pairs)} pairs populated in {pool.warmup:.1f}s")
+            self.pools[key] = pool
+        self.pools.move_to_end(key)
+        while len(self.pools) > self.max_pools:
+            _, evicted = self.pools.popitem(last=False)
+            logger.info(f"Closing the {evicted.strategy} {evicted.timeframe} pool")
+            evicted.close()
+        future = pool.submit(args, request['loss_function'], request['hyperopt_jobs'], request['epochs'],
+                             request['previous_results'], request['rung'])
+        return pool, future
+
+    def run(self, request):
+        if request['cwd'] != os.getcwd():
+            raise ValueError(f"The daemon runs in {os.getcwd()}, not in {request['cwd']}")
+        args = argparse.Namespace(**request['args'])
+        pool, future = self.call(self.submit, args, request)
+        try:
+            job = future.result()
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory): the next job of this pool starts a new one
+            self.call(self.discard, pool)
+            raise
+        logger.info(f"{request['strategy']} {request['loss_function']} {request['timeframe']} "
+                    f"done in {job['runtime']:.1f}s")
+        return job
+
+    def discard(self, pool):
+        if self.pools.get(pool.key) is pool:
+            del self.pools[pool.key]
+            pool.close()
+
+    def status(self):
+        return [{'strategy': pool.strategy, 'timeframe': pool.timeframe, 'pairs': pool.pairs,
+                 'jobs': pool.jobs, 'warmup': pool.warmup} for pool in self.pools.values()]
+
+    def close(self):
+        # The calls not run yet fail in their request threads
+        while True:
+            try:
+                call = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            if call is not None:
+                call[0].cancel()
+        for pool in self.pools.values():
+            pool.close()
+        self.pools.clear()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        daemon = self.server.hyperopt_daemon
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+            command = request.get('command')
+            if command == 'run':
+                response = {'job': daemon.run(request)}
+            elif command == 'status':
+                response = {'pools': daemon.call(daemon.status)}
+            elif command == 'stop':
+                response = {'stopping': True}
+            else:
+                raise ValueError(f"Unknown command {command}")
+        except Exception as e:
+            logger.exception("Request failed")
+            response = {'error': repr(e)}
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+        if response.get('stopping'):
+            daemon.stop()
+
+
+def serve(socket_path, nb_workers, max_pools):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    with socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler) as server:
+        server.daemon_threads = True
+        daemon = server.hyperopt_daemon = HyperoptDaemon(nb_workers, max_pools)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info(f"Hyperopt daemon listening on {socket_path} ({nb_workers} workers per pool)")
+        try:
+            daemon.serve_calls()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            daemon.close()
+            os.remove(socket_path)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Hyperopt daemon keeping warm worker pools for the sweep jobs.')
+    parser.add_argument('command', nargs='?', choices=['serve', 'status', 'stop'], default='serve', help='Start the daemon, show its pools or stop it (Default: serve)')
+    parser.add_argument('-S', '--socket', default=DEFAULT_SOCKET, help=f'Unix socket of the daemon (Default: {DEFAULT_SOCKET})')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of workers per pool (Default: all available cores)')
+    parser.add_argument('--max-pools', type=int, default=4, help='Number of strategy/timeframe pools kept warm (Default: 4)')
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == 'serve':
+        serve(args.socket, args.jobs or os.cpu_count() or 1, args.max_pools)
+    elif args.command == 'status':
+        for pool in daemon_request(args.socket, {'command': 'status'})['pools']:
+            print(f"{pool['strategy']} {pool['timeframe']}: {len(pool['pairs'])} pairs, "
+                  f"{pool['jobs']} jobs, warmup {pool['warmup']:.1f}s")
+    else:
+        daemon_request(args.socket, {'command': 'stop'})
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
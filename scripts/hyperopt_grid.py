@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+#
+# Exhaustive evaluation of the small discrete buy/sell spaces of a hyperopt class (BBRSIHyperopt).
+#
+# The buy space of BBRSIHyperopt has 46 x 2 x 4 = 368 points and its sell space 71 x 2 x 3 = 426:
+# instead of sampling them with random restarts, every point is enumerated. The signals of all
+# the points of a space are computed at once with the batch signal methods of the hyperopt class
+# (buy_signal_matrix / sell_signal_matrix) and kept bit-packed (see packed_signals.py). The points
+# giving the same signals on all the pairs (e.g. all the rsi values when the rsi is disabled) are
+# evaluated once: the distinct signal combinations are backtested and scored by the loss function
+# in a pool of forked workers sharing the populated frames and the signals. As in a hyperopt, a
+# combination with less than hyperopt_min_trades trades gets the maximal loss.
+# The combinations are the product of the distinct signals of the spaces, each one a full
+# backtest: the grid stops before the backtests when there are more than --max-combinations.
+#
+# A space not in --spaces keeps the signals of the strategy, as in a hyperopt.
+#
+# Must be run with the freqtrade environment available, e.g. from the ft_userdata directory:
+#   sudo docker-compose run --rm -v "$(pwd):/sweep" --entrypoint python3 freqtrade /sweep/hyperopt_grid.py
+#
+# usage: hyperopt_grid.py [-h] [-c CONFIG] [-u USERDIR] [-s STRATEGY] [--hyperopt HYPEROPT] [-l LOSS]
+#                         [-t TIMEFRAME] [--spaces {buy,sell} [{buy,sell} ...]] [--max-points MAX_POINTS]
+#                         [--max-combinations MAX_COMBINATIONS] [-j JOBS] [-n TOP] [-o OUTPUT] [--ohlcv-store DIR]
+
+import os
+import sys
+import math
+import time
+import hashlib
+import logging
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from skopt.space import Categorical, Integer
+
+from freqtrade.commands.optimize_commands import setup_optimize_configuration
+from freqtrade.data.converter import trim_dataframe
+from freqtrade.data.history import get_timerange
+from freqtrade.enums import RunMode
+from freqtrade.optimize.backtesting import Backtesting
+from freqtrade.optimize.hyperopt import MAX_LOSS
+from freqtrade.resolvers.hyperopt_resolver import HyperOptLossResolver, HyperOptResolver
+
+from extract_hyperopt_result import write_rows
+from hyperopt_sweep import populate_frames
+from ohlcv_store import OHLCVStore, load_bt_data
+from packed_signals import PackedSignals, pack
+
+SIGNAL_METHODS = {'buy': 'buy_signal_matrix', 'sell': 'sell_signal_matrix'}
+SPACE_METHODS = {'buy': 'indicator_space', 'sell': 'sell_indicator_space'}
+
+logger = logging.getLogger(__name__)
+
+# State of the grid loaded by the parent process, inherited by the forked workers
+_grid = {}
+
+
+def dimension_values(dimension):
+    """All the values of a categorical or integer dimension."""
+    if isinstance(dimension, Categorical):
+        return list(dimension.categories)
+    if isinstance(dimension, Integer):
+        return list(range(dimension.low, dimension.high + 1))
+    raise ValueError(f"{dimension.name}: only categorical and integer dimensions can be enumerated")
+
+
+def grid_points(dimensions):
+    """Params of all the points of a space."""
+    names = [dimension.name for dimension in dimensions]
+    return [dict(zip(names, values)) for values in itertools.product(*map(dimension_values, dimensions))]
+
+
+def distinct_signals(custom_hyperopt, space, points, processed):
+    """
+    Signals of all the points of a space, grouped by identical signals on all the pairs.
+    :return: (representative point indices, number of points of each group,
+              {pair: packed signal words of the representatives})
+    """
+    signal_matrix = getattr(custom_hyperopt, SIGNAL_METHODS[space])
+    digests = [hashlib.sha1() for _ in points]
+    packed = {}
+    for pair, dataframe in processed.items():
+        pair_packed = pack(signal_matrix(dataframe, points))
+        for digest, row in zip(digests, pair_packed):
+            digest.update(pair.encode())
+            digest.update(row.tobytes())
+        packed[pair] = pair_packed
+
+    groups = {}
+    for index, digest in enumerate(digests):
+        groups.setdefault(digest.digest(), []).append(index)
+    representatives = [indices[0] for indices in groups.values()]
+    sizes = [len(indices) for indices in groups.values()]
+    return representatives, sizes, {pair: pair_packed[representatives] for pair, pair_packed in packed.items()}
+
+
+def signal_setter(column, packed, index):
+    """
+    advise_buy / advise_sell setting the signals of a representative point, as an int8 column
+    (one byte per candle, compared to 1 by the backtest as the int64 columns of the strategies).
+    """
+    def advise(dataframe, metadata):
+        dataframe[column] = PackedSignals(packed[metadata['pair']][index], len(dataframe)).to_column()
+        return dataframe
+
+    return advise
+
+
+def backtest_row(results, loss, config):
+    """Result row of a combination, with the columns of extract_hyperopt_result.py."""
+    profit = results['profit_ratio']
+    profit_abs = results['profit_abs'].sum()
+    return {
+        'trades': str(len(results)),
+        'wins': str(int((profit > 0).sum())),
+        'draws': str(int((profit == 0).sum())),
+        'losses': str(int((profit < 0).sum())),
+        'avg_profit': f"{profit.mean() * 100 if len(results) else 0.:.2f}",
+        'median_profit': f"{profit.median() * 100 if len(results) else 0.:.2f}",
+        'total_profit': f"{profit_abs:.8f}",
+        'profit_unit': config['stake_currency'],
+        'profit_percent': f"{profit_abs / config['dry_run_wallet'] * 100:.2f}",
+        'avg_duration': f"{results['trade_duration'].mean() if len(results) else 0.:.1f}",
+        'objective': f"{loss:.5f}",
+    }
+
+
+def evaluate(combinations):
+    """Backtest and score combinations of (buy index, sell index) of the representative points."""
+    backtesting = _grid['backtesting']
+    strategy = backtesting.strategy
+    config = _grid['config']
+    advise_buy, advise_sell = strategy.advise_buy, strategy.advise_sell
+
+    rows = []
+    for buy_index, sell_index in combinations:
+        strategy.advise_buy = (signal_setter('buy', _grid['buy'], buy_index)
+                               if buy_index is not None else advise_buy)
+        strategy.advise_sell = (signal_setter('sell', _grid['sell'], sell_index)
+                                if sell_index is not None else advise_sell)
+        # The backtest sets the signal columns of the frames: each combination gets a copy
+        processed = {pair: dataframe.copy() for pair, dataframe in _grid['processed'].items()}
+        output = backtesting.backtest(processed=processed, start_date=_grid['min_date'], end_date=_grid['max_date'],
+                                      max_open_trades=_grid['max_open_trades'],
+                                      position_stacking=config.get('position_stacking', False),
+                                      enable_protections=config.get('enable_protections', False))
+        # Dict with the results in the recent freqtrade versions
+        results = output['results'] if isinstance(output, dict) else output
+        # As in a hyperopt: too few trades (or an undefined objective) is the maximal loss
+        loss = MAX_LOSS
+        if len(results) >= config.get('hyperopt_min_trades', 1):
+            loss = _grid['loss_function'](results=results, trade_count=len(results),
+                                          min_date=_grid['min_date'], max_date=_grid['max_date'],
+                                          config=config, processed=processed)
+            if not math.isfinite(loss):
+                loss = MAX_LOSS
+        rows.append((buy_index, sell_index, backtest_row(results, loss, config)))
+    return rows
+
+
+def load_grid(args):
+    """Load the data, the hyperopt class and the distinct signals of the spaces in _grid."""
+    ft_args = {
+        'config': args.config,
+        'user_data_dir': args.userdir,
+        'strategy': args.strategy,
+        'hyperopt': args.hyperopt,
+        'hyperopt_loss': args.loss,
+        'timeframe': args.timeframe,
+    }
+    config = setup_optimize_configuration({key: value for key, value in ft_args.items() if value is not None},
+                                          RunMode.HYPEROPT)
+    backtesting = Backtesting(config)
+    custom_hyperopt = HyperOptResolver.load_hyperopt(config)
+    loss_function = HyperOptLossResolver.load_hyperoptloss(config).hyperopt_loss_function
+
+    if args.ohlcv_store:
+        data, timerange = load_bt_data(OHLCVStore(args.ohlcv_store), backtesting)
+    else:
+        data, timerange = backtesting.load_bt_data()
+    if hasattr(custom_hyperopt, 'populate_indicators'):
+        backtesting.strategy.advise_indicators = custom_hyperopt.populate_indicators
+    processed = {pair: trim_dataframe(dataframe, timerange, startup_candles=backtesting.required_startup)
+                 for pair, dataframe in populate_frames(backtesting.strategy, data).items()}
+    min_date, max_date = get_timerange(processed)
+
+    _grid.update({
+        'config': config,
+        'backtesting': backtesting,
+        'loss_function': loss_function,
+        'processed': processed,
+        'min_date': min_date,
+        'max_date': max_date,
+        'max_open_trades': config['max_open_trades'] if config.get('use_max_market_positions', True) else 0,
+    })
+
+    indices = {'buy': [None], 'sell': [None]}
+    for space in args.spaces:
+        if not hasattr(custom_hyperopt, SIGNAL_METHODS[space]):
+            raise ValueError(f"{type(custom_hyperopt).__name__} has no {SIGNAL_METHODS[space]} method")
+        points = grid_points(getattr(custom_hyperopt, SPACE_METHODS[space])())
+        if len(points) > args.max_points:
+            raise ValueError(f"The {space} space has {len(points)} points (more than {args.max_points})")
+        representatives, sizes, packed = distinct_signals(custom_hyperopt, space, points, processed)
+        logger.info(f"{space} space: {len(points)} points, {len(representatives)} distinct signals")
+        _grid[space] = packed
+        _grid[f'{space}_points'] = [points[index] for index in representatives]
+        _grid[f'{space}_sizes'] = sizes
+        indices[space] = list(range(len(representatives)))
+
+    return list(itertools.product(indices['buy'], indices['sell']))
+
+
+def run_grid(args):
+    start = time.time()
+    combinations = load_grid(args)
+    # Each combination is a full backtest: the product of the distinct signals of the spaces can be much
+    # more than the epochs of a hyperopt
+    if len(combinations) > args.max_combinations:
+        sys.exit(f"{len(combinations)} distinct signal combinations to backtest, more than --max-combinations "
+                 f"{args.max_combinations}: enumerate fewer spaces, shorten the timerange or raise --max-combinations")
+    nb_workers = max(1, min(args.jobs or os.cpu_count() or 1, len(combinations)))
+    logger.info(f"Evaluating {len(combinations)} combinations with {nb_workers} workers")
+
+    # Several chunks per worker to balance the load
+    chunk_size = max(1, len(combinations) // (nb_workers * 4))
+    chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+
+    rows = []
+    # Fork after the grid is loaded so that the workers share it
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=nb_workers, mp_context=context) as executor:
+        futures = [executor.submit(evaluate, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            rows += future.result()
+            logger.info(f"{len(rows)}/{len(combinations)} combinations evaluated")
+
+    rows.sort(key=lambda row: float(row[2]['objective']))
+    output_rows = []
+    for rank, (buy_index, sell_index, row) in enumerate(rows[:args.top], start=1):
+        row.update({'strategie': args.strategy, 'lossFunction': args.loss, 'timeframe': args.timeframe,
+                    'epoch': str(rank), 'nb_epoch': str(len(rows))})
+        equivalent = 1
+        for space, index in [('buy', buy_index), ('sell', sell_index)]:
+            if index is not None:
+                row.update(_grid[f'{space}_points'][index])
+                equivalent *= _grid[f'{space}_sizes'][index]
+        logger.info(f"#{rank} objective {row['objective']}, {row['trades']} trades, "
+                    f"{row['profit_percent']}% ({equivalent} equivalent points)")
+        output_rows.append(row)
+
+    write_rows(output_rows, args.output)
+    logger.info(f"{len(output_rows)} best combinations written to {args.output} in {time.time() - start:.1f}s")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Evaluate every point of the discrete buy/sell spaces of a hyperopt.')
+    parser.add_argument('-c', '--config', nargs='+', default=['user_data/config.json'], help='Freqtrade configuration file(s) (Default: user_data/config.json)')
+    parser.add_argument('-u', '--userdir', default='user_data', help='Freqtrade user data directory (Default: user_data)')
+    parser.add_argument('-s', '--strategy', default='BBRSINaiveStrategy', help='Strategy (Default: BBRSINaiveStrategy)')
+    parser.add_argument('--hyperopt', default='BBRSIHyperopt', help='Hyperopt class with batch signal methods (Default: BBRSIHyperopt)')
+    parser.add_argument('-l', '--loss', default='SharpeHyperOptLoss', help='Loss function (Default: SharpeHyperOptLoss)')
+    parser.add_argument('-t', '--timeframe', default='15m', help='Timeframe (Default: 15m)')
+    parser.add_argument('--spaces', nargs='+', choices=['buy', 'sell'], default=['buy', 'sell'], help='Spaces to enumerate (Default: buy sell)')
+    parser.add_argument('--max-points', type=int, default=10000, help='Maximal number of points of a space (Default: 10000)')
+    parser.add_argument('--max-combinations', type=int, default=10000, help='Maximal number of distinct buy x sell signal combinations backtested (Default: 10000)')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of cores to use (Default: all available cores)')
+    parser.add_argument('-n', '--top', type=int, default=10, help='Number of best combinations written (Default: 10)')
+    parser.add_argument('-o', '--output', default='./hyperopt_grid.csv', help='Output file (CSV, or SQLite results store if .sqlite/.db)')
+    parser.add_argument('--ohlcv-store', help='Read the candles from this store (see ohlcv_store.py) instead of the data files')
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    run_grid(args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+#
+# SQLite store of the hyperopt results, used instead of the CSV file when the output file
+# of the extraction scripts or of the sweep ends with .sqlite or .db.
+#
+# Each result has typed columns (trades, wins, profits, objective, ...) and its hyperopt
+# params in a JSON column, so results of strategies with different params share the table.
+# The schema version is kept in the user_version pragma and upgraded when the store is opened.
+#
+# Run as a script, it imports CSV result files and prints the best results per timeframe.
+#
+# usage: hyperopt_results_store.py [-h] [-n TOP] [-s STRATEGY] [-l LOSS] [--import-csv CSV [CSV ...]] DATABASE
+
+import sys
+import csv
+import json
+import time
+import sqlite3
+import argparse
+
+STORE_SUFFIXES = ('.sqlite', '.db')
+
+# Schema upgrades (statements), the version of the schema is the number of applied upgrades
+MIGRATIONS = [
+    [
+        """
+        CREATE TABLE results (
+            id INTEGER PRIMARY KEY,
+            strategy TEXT,
+            loss_function TEXT,
+            timeframe TEXT,
+            epoch INTEGER,
+            nb_epoch INTEGER,
+            trades INTEGER,
+            wins INTEGER,
+            draws INTEGER,
+            losses INTEGER,
+            avg_profit REAL,
+            median_profit REAL,
+            total_profit REAL,
+            profit_unit TEXT,
+            profit_percent REAL,
+            avg_duration REAL,
+            objective REAL,
+            params TEXT,
+            created REAL
+        )
+        """,
+        'CREATE INDEX results_run ON results (strategy, loss_function, timeframe)',
+        'CREATE INDEX results_timeframe_objective ON results (timeframe, objective)',
+    ],
+]
+
+def is_store(file_name):
+    return str(file_name).endswith(STORE_SUFFIXES)
+
+
+def duration_minutes(value):
+    """Average trade duration in minutes, from minutes or from a "[N day(s), ]h:mm:ss" duration."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    days = 0
+    if ',' in value:
+        days_part, value = value.split(',', 1)
+        days = int(days_part.split()[0])
+    hours, minutes, seconds = (float(part) for part in value.strip().split(':'))
+    return days * 1440 + hours * 60 + minutes + seconds / 60
+
+
+# Row key (as in the CSV files) -> (column, type)
+COLUMNS = {
+    'strategie': ('strategy', str),
+    'lossFunction': ('loss_function', str),
+    'timeframe': ('timeframe', str),
+    'epoch': ('epoch', int),
+    'nb_epoch': ('nb_epoch', int),
+    'trades': ('trades', int),
+    'wins': ('wins', int),
+    'draws': ('draws', int),
+    'losses': ('losses', int),
+    'avg_profit': ('avg_profit', float),
+    'median_profit': ('median_profit', float),
+    'total_profit': ('total_profit', float),
+    'profit_unit': ('profit_unit', str),
+    'profit_percent': ('profit_percent', float),
+    'avg_duration': ('avg_duration', duration_minutes),
+    'objective': ('objective', float),
+}
+
+
+def _value(value, column_type):
+    if value is None or value == '':
+        return None
+    try:
+        return column_type(value)
+    except ValueError:
+        return None
+
+
+class ResultsStore:
+
+    def __init__(self, path):
+        self.path = path
+        # Several extractions may write at the same time: wait for the lock of the other writers
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.row_factory = sqlite3.Row
+        self.migrate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def migrate(self):
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+            return
+        # One transaction for the upgrades and the version (executescript would commit first).
+        # Another process may be upgrading the store: wait for its lock and read the version again
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+            for migration in MIGRATIONS[version:]:
+                for statement in migration:
+                    self.connection.execute(statement)
+            self.connection.execute(f'PRAGMA user_version = {max(version, len(MIGRATIONS))}')
+
+    def add_rows(self, rows, skip_existing=False):
+        """
+        Insert result rows (dicts with the keys of the CSV files, the other keys are params).
+        With skip_existing, the rows equal to a result of the store are not inserted again.
+        """
+        columns = [column for column, _ in COLUMNS.values()] + ['params']
+        created = time.time()
+        values = []
+        for row in rows:
+            params = {key: value for key, value in row.items() if key not in COLUMNS}
+            values.append([_value(row.get(key), column_type) for key, (_, column_type) in COLUMNS.items()]
+                          + [json.dumps(params)])
+
+        with self.connection:
+            if skip_existing:
+                # Write lock first: the rows read are still the ones of the store when inserting
+                self.connection.execute('BEGIN IMMEDIATE')
+                condition = ' AND '.join(f'{column} IS ?' for column in columns)
+                values = [row_values for row_values in values if self.connection.execute(
+                    f'SELECT 1 FROM results WHERE {condition} LIMIT 1', row_values).fetchone() is None]
+            self.connection.executemany(
+                f"INSERT INTO results ({', '.join(columns)}, created) VALUES ({', '.join('?' * len(columns))}, ?)",
+                [row_values + [created] for row_values in values])
+        return len(values)
+
+    def import_csv(self, csv_file_name):
+        with open(csv_file_name, 'r') as csv_file:
+            return self.add_rows(csv.DictReader(csv_file))
+
+    def top(self, n=10, strategy=None, loss_function=None):
+        """Best n results (lowest objective) of each timeframe, with the params as a dict."""
+        conditions, parameters = [], []
+        if strategy:
+            conditions.append('strategy = ?')
+            parameters.append(strategy)
+        if loss_function:
+            conditions.append('loss_function = ?')
+            parameters.append(loss_function)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        query = f"""
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY timeframe ORDER BY objective IS NULL, objective) AS rank
+                FROM results {where}
+            )
+            WHERE rank <= ?
+            ORDER BY timeframe, rank
+        """
+        results = []
+        for row in self.connection.execute(query, parameters + [n]):
+            result = dict(row)
+            result['params'] = json.loads(result['params'])
+            results.append(result)
+        return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Show the best hyperopt results of a results store.')
+    parser.add_argument('database', metavar='DATABASE', type=str, help='SQLite results store')
+    parser.add_argument('-n', '--top', type=int, default=10, help='Number of results per timeframe (Default: 10)')
+    parser.add_argument('-s', '--strategy', help='Only show the results of this strategy')
+    parser.add_argument('-l', '--loss', help='Only show the results of this loss function')
+    parser.add_argument('--import-csv', nargs='+', default=[], help='Import CSV result files in the store first')
+
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.database) as store:
+        for csv_file_name in args.import_csv:
+            print(f"{store.import_csv(csv_file_name)} results imported from {csv_file_name}")
+
+        for result in store.top(args.top, args.strategy, args.loss):
+            objective = f"{result['objective']: .5f}" if result['objective'] is not None else '-'
+            print(f"{result['timeframe'] or '-':>4} #{result['rank']:<3} {objective} "
+                  f"{result['strategy']} {result['loss_function']} epoch {result['epoch']}/{result['nb_epoch']}: "
+                  f"{result['trades']} trades, {result['profit_percent']}% {json.dumps(result['params'])}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+#
+# Run a hyperopt sweep (strategy x loss function x timeframe) in a single process
+# and extract the best result of each run in a CSV file.
+#
+# The candle data and the strategy are loaded once per strategy/timeframe. All the
+# loss functions of this strategy/timeframe then run as jobs of a process pool sized
+# to the available cores (the jobs are forked and share the loaded data).
+# The populated indicators are kept in an on-disk cache (see indicator_cache.py) shared
+# by the jobs and by the next sweeps.
+# The candles can be read from a memory-mapped store built by ohlcv_store.py instead of the
+# data files.
+# The jobs are recorded in a ledger (see sweep_ledger.py): an interrupted sweep started
+# again only runs the jobs that are not done yet with the same spaces, config files and output
+# (the jobs interrupted after their hyperopt only get their result written to the output).
+# With --derive-timeframes, only the finest timeframe is loaded and the coarser ones are
+# resampled from it in memory (see ohlcv_resample.py). The weekly and monthly timeframes are
+# still loaded from their files.
+# With --adaptive, the epochs of the sweep go to the runs still improving, in successive-halving
+# rungs (see sweep_scheduler.py) instead of the same number of epochs for every run.
+# With --signal-cache, the signals of the epochs are reused by the next epochs with the same
+# buy/sell parameters (e.g. every epoch of a roi/stoploss hyperopt), see signal_cache.py. With
+# --fingerprint-cache, the epochs giving the same signals and exit settings as a previous epoch
+# get its backtest, see signal_fingerprint.py.
+# With --daemon, the jobs are run by a hyperopt_daemon.py started beforehand, whose workers
+# already hold the loaded data and the populated indicators.
+#
+# Must be run with the freqtrade environment available, e.g. from the ft_userdata directory:
+#   sudo docker-compose run --rm -v "$(pwd):/sweep" --entrypoint python3 freqtrade /sweep/hyperopt_sweep.py
+#
+# usage: hyperopt_sweep.py [-h] [-c CONFIG] [-u USERDIR] [-s STRATEGY [STRATEGY ...]]
+#                          [-l LOSS [LOSS ...]] [-t TIMEFRAME [TIMEFRAME ...]]
+#                          [-e EPOCHS] [--spaces SPACES [SPACES ...]] [-j JOBS] [-o OUTPUT]
+#                          [--indicator-cache DIR] [--cache-size MB] [--no-indicator-cache]
+#                          [--ohlcv-store DIR] [--ledger FILE] [--restart]
+#                          [--adaptive] [--eta ETA] [--patience PATIENCE] [--min-delta MIN_DELTA]
+#                          [--derive-timeframes] [--signal-cache ENTRIES]
+#                          [--fingerprint-cache ENTRIES] [--daemon SOCKET]
+
+import os
+import sys
+import copy
+import json
+import math
+import hashlib
+import time
+import socket
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
+
+import pandas as pd
+from freqtrade.commands.optimize_commands import setup_optimize_configuration
+from freqtrade.configuration import TimeRange
+from freqtrade.data.history import get_timerange, load_data
+from freqtrade.enums import RunMode
+from freqtrade.exchange import timeframe_to_seconds
+from freqtrade.optimize.backtesting import Backtesting
+import freqtrade.optimize.hyperopt as hyperopt_module
+from freqtrade.optimize.hyperopt import Hyperopt
+
+from extract_all_hyperopt_results import extract_file, load_epochs
+from extract_hyperopt_result import write_rows
+from indicator_cache import IndicatorCache
+from ohlcv_resample import TIMEFRAME_SECONDS, resample_ohlcv
+from ohlcv_store import OHLCVStore, load_bt_data
+from signal_cache import SignalCache
+from signal_fingerprint import FingerprintCache
+from sweep_ledger import DONE, EXTRACTING, SweepLedger
+from sweep_scheduler import PlateauStopper, SuccessiveHalving, warm_start
+
+DEFAULT_TIMEFRAMES = ["5m", "15m", "1h", "1d"]
+
+DEFAULT_LOSS_FUNCTIONS = ["ShortTradeDurHyperOptLoss", "OnlyProfitHyperOptLoss", "SharpeHyperOptLoss",
+                          "SharpeHyperOptLossDaily", "SortinoHyperOptLoss", "SortinoHyperOptLossDaily"]
+
+DEFAULT_STRATEGIES = ["BBRSINaiveStrategyWithHyperoptCode"]
+
+logger = logging.getLogger(__name__)
+
+# Candle data loaded by the parent process, inherited by the forked jobs.
+# (strategy, timeframe) -> (data, timerange)
+_preloaded = {}
+# Frames populated by the parent process (hyperopt daemon), (strategy, timeframe) -> {pair: dataframe}
+_populated = {}
+# Backtesting and trimmed frames prepared once by the parent process (hyperopt daemon).
+# (strategy, timeframe) -> (backtesting, data pickle file, min date, max date)
+_prepared = {}
+
+# Keys of the configuration of a job which differ from the configuration of its daemon pool
+JOB_CONFIG_KEYS = ['epochs', 'spaces', 'hyperopt_loss', 'hyperopt_jobs']
+
+
+def build_config(args, strategy, timeframe, loss_function=None, hyperopt_jobs=1):
+    """Build a freqtrade configuration as the hyperopt sub-command would do."""
+    ft_args = {
+        'config': args.config,
+        'user_data_dir': args.userdir,
+        'strategy': strategy,
+        'timeframe': timeframe,
+        'epochs': args.epochs,
+        'spaces': args.spaces,
+        'hyperopt_loss': loss_function,
+        'hyperopt_jobs': hyperopt_jobs,
+        'print_json': True,
+        'print_colorized': False,
+    }
+    ft_args = {key: value for key, value in ft_args.items() if value is not None}
+    return setup_optimize_configuration(ft_args, RunMode.HYPEROPT)
+
+
+def indicator_cache(args):
+    if args.no_indicator_cache:
+        return None
+    cache_dir = args.indicator_cache or os.path.join(args.userdir, 'indicator_cache')
+    return IndicatorCache(cache_dir, max_bytes=args.cache_size * 1024 ** 2)
+
+
+def preload_data(args, strategy, timeframe):
+    """Load the strategy and its candle data once for all the loss functions."""
+    config = build_config(args, strategy, timeframe)
+    backtesting = Backtesting(config)
+    if args.ohlcv_store:
+        data, timerange = load_bt_data(OHLCVStore(args.ohlcv_store), backtesting)
+    else:
+        data, timerange = backtesting.load_bt_data()
+    _preloaded[(strategy, timeframe)] = (data, timerange)
+
+    # Warm the indicator cache before the jobs are forked
+    cache = indicator_cache(args)
+    if cache:
+        cache.populate_all(backtesting.strategy, timeframe, data)
+
+
+def preload_derived_data(args, strategy, timeframes):
+    """
+    Load the candles of the finest timeframe once, with the startup candles of the coarsest one,
+    and derive the data of the coarser timeframes (multiples of the finest) from them.
+    The timeframes which cannot be derived are left to preload_data.
+    """
+    # resample_ohlcv buckets on the epoch, in minutes, hours or days only: weekly buckets would start
+    # on Thursday instead of Monday like the exchange candles
+    resamplable = [timeframe for timeframe in timeframes if timeframe[-1] in TIMEFRAME_SECONDS]
+    if not resamplable:
+        return
+    finest = min(resamplable, key=timeframe_to_seconds)
+    derived = [timeframe for timeframe in resamplable
+               if timeframe_to_seconds(timeframe) % timeframe_to_seconds(finest) == 0]
+
+    config = build_config(args, strategy, finest)
+    backtesting = Backtesting(config)
+    startup = backtesting.required_startup
+    pairs = backtesting.pairlists.whitelist
+    timerange = TimeRange.parse_timerange(None if config.get('timerange') is None
+                                          else str(config.get('timerange')))
+
+    # Enough finest candles for the startup candles of all the timeframes
+    base_timerange = TimeRange(timerange.starttype, timerange.stoptype, timerange.startts, timerange.stopts)
+    if base_timerange.starttype == 'date':
+        base_timerange.subtract_start(max(timeframe_to_seconds(timeframe) for timeframe in derived) * startup)
+    stop = timerange.stopts if timerange.stoptype == 'date' else None
+
+    if args.ohlcv_store:
+        start = base_timerange.startts if base_timerange.starttype == 'date' else None
+        base_data = OHLCVStore(args.ohlcv_store).load_all(pairs, finest, start, stop)
+    else:
+        base_data = load_data(datadir=config['datadir'], pairs=pairs, timeframe=finest, timerange=base_timerange,
+                              fail_without_data=True, data_format=config.get('dataformat_ohlcv', 'json'))
+
+    # Only the complete candles: a partial first/last period would differ from the exchange candle
+    resampled = {pair: resample_ohlcv(pair_data, derived, complete_only=True) for pair, pair_data in base_data.items()}
+    del base_data
+
+    cache = indicator_cache(args)
+    for timeframe in derived:
+        data = {}
+        for pair, pair_timeframes in resampled.items():
+            pair_data = pair_timeframes.pop(timeframe)
+            if timerange.starttype == 'date':
+                start = timerange.startts - timeframe_to_seconds(timeframe) * startup
+                pair_data = pair_data[pair_data['date'] >= pd.to_datetime(start, unit='s', utc=True)]
+            if stop is not None:
+                pair_data = pair_data[pair_data['date'] <= pd.to_datetime(stop, unit='s', utc=True)]
+            if len(pair_data):
+                data[pair] = pair_data.reset_index(drop=True)
+
+        timeframe_range = TimeRange(timerange.starttype, timerange.stoptype, timerange.startts, timerange.stopts)
+        min_date, max_date = get_timerange(data)
+        timeframe_range.adjust_start_if_necessary(timeframe_to_seconds(timeframe), startup, min_date)
+        _preloaded[(strategy, timeframe)] = (data, timeframe_range)
+        logger.info(f"{strategy} {timeframe} data derived from {finest}")
+
+        if cache:
+            cache.populate_all(backtesting.strategy, timeframe, data)
+
+
+def populate_frames(strategy, data):
+    """Populate the indicators of all the pairs with the strategy."""
+    # Method renamed in the recent freqtrade versions
+    for name in ['advise_all_indicators', 'ohlcvdata_to_dataframe']:
+        if hasattr(strategy, name):
+            return getattr(strategy, name)(data)
+    return {pair: strategy.advise_indicators(pair_data.copy(), {'pair': pair}) for pair, pair_data in data.items()}
+
+
+def install_populated(strategy, populated):
+    """Make the strategy return the frames populated beforehand instead of populating them."""
+    def populate_all(data):
+        return {pair: populated[pair].copy() for pair in data}
+
+    for name in ['ohlcvdata_to_dataframe', 'advise_all_indicators']:
+        if hasattr(strategy, name):
+            setattr(strategy, name, populate_all)
+
+
+def prepared_hyperopt(config, backtesting, data_pickle_file, min_date, max_date):
+    """
+    Hyperopt of a job on the Backtesting prepared by its daemon pool (exchange, markets, pairlist
+    and strategy already loaded) and on the frames trimmed and dumped once by the pool.
+    The hyperopt gets copies of the Backtesting, exchange and strategy, which it modifies.
+    """
+    job_config = copy.deepcopy(backtesting.config)
+    for key in JOB_CONFIG_KEYS:
+        if key in config:
+            job_config[key] = config[key]
+        else:
+            job_config.pop(key, None)
+
+    def copy_backtesting(config):
+        copied = copy.copy(backtesting)
+        copied.config = config
+        copied.all_results = {}
+        # start() closes the exchange of the hyperopt and drops its pairlists
+        copied.exchange = copy.copy(backtesting.exchange)
+        copied.strategylist = [copy.copy(strategy) for strategy in backtesting.strategylist]
+        for strategy in copied.strategylist:
+            strategy.config = config
+        return copied
+
+    hyperopt_module.Backtesting = copy_backtesting
+    try:
+        hyperopt = Hyperopt(job_config)
+    finally:
+        hyperopt_module.Backtesting = Backtesting
+    hyperopt.data_pickle_file = data_pickle_file
+
+    def prepare_hyperopt_data():
+        hyperopt.min_date, hyperopt.max_date = min_date, max_date
+
+    hyperopt.prepare_hyperopt_data = prepare_hyperopt_data
+    return hyperopt
+
+
+def sweep_settings(args):
+    """Hash of the settings of the sweep changing the results of its jobs: spaces, config files (timerange, pairs...) and output."""
+    digest = hashlib.sha1()
+    for part in [' '.join(sorted(args.spaces or [])), os.path.abspath(args.output)]:
+        digest.update(f"{part}\0".encode())
+    for path in args.config:
+        with open(path, 'rb') as config_file:
+            digest.update(config_file.read())
+    return digest.hexdigest()
+
+
+def job_name(strategy, loss_function, timeframe):
+    return f"{strategy}_{loss_function}_{timeframe}"
+
+
+def run_hyperopt_job(args, strategy, loss_function, timeframe, hyperopt_jobs, epochs=None,
+                     previous_results=(), rung=None):
+    """
+    Run one hyperopt in a pool worker, reusing the data loaded by the parent.
+    In an adaptive sweep, the run stops on a plateau and continues the epochs of previous_results.
+    """
+    start = time.time()
+    data, timerange = _preloaded[(strategy, timeframe)]
+
+    config = build_config(args, strategy, timeframe, loss_function, hyperopt_jobs)
+    if epochs:
+        config['epochs'] = epochs
+    prepared = _prepared.get((strategy, timeframe))
+    hyperopt = prepared_hyperopt(config, *prepared) if prepared else Hyperopt(config)
+    hyperopt.backtesting.load_bt_data = lambda: (data, timerange)
+    cache = None
+    if (strategy, timeframe) in _populated:
+        install_populated(hyperopt.backtesting.strategy, _populated[(strategy, timeframe)])
+    else:
+        cache = indicator_cache(args)
+        if cache:
+            cache.install(hyperopt.backtesting.strategy, timeframe)
+    signal_cache_stats = None
+    if args.signal_cache:
+        signal_cache_stats = SignalCache.install(hyperopt, args.signal_cache)
+    if args.fingerprint_cache:
+        FingerprintCache.install(hyperopt, args.fingerprint_cache)
+
+    stopper = None
+    if args.adaptive:
+        previous_epochs = [epoch for results_file in previous_results for epoch in load_epochs(results_file)]
+        stopper = PlateauStopper(args.patience, args.min_delta,
+                                 min((epoch['loss'] for epoch in previous_epochs), default=math.inf))
+        stopper.install(hyperopt)
+        if previous_epochs:
+            warm_start(hyperopt, previous_epochs)
+
+    # One results file per job: parallel jobs may start in the same second
+    name = job_name(strategy, loss_function, timeframe)
+    results_file = hyperopt.results_file
+    hyperopt.results_file = results_file.with_name(
+        f"hyperopt_results_{name}_{time.strftime('%Y-%m-%d_%H-%M-%S')}"
+        f"{f'_rung{rung}' if rung else ''}{results_file.suffix}")
+    log_file = hyperopt.results_file.with_suffix('.log')
+    if not prepared:
+        # One data pickle per job too: each hyperopt writes it at its start and the epochs read it back,
+        # the default hyperopt_tickerdata.pkl would be overwritten by the other jobs
+        hyperopt.data_pickle_file = hyperopt.results_file.with_suffix('.pkl')
+
+    try:
+        with open(log_file, 'w') as log:
+            with redirect_stdout(log), redirect_stderr(log):
+                hyperopt.start()
+    finally:
+        # The data pickle of a daemon pool is shared by its jobs
+        if not prepared and hyperopt.data_pickle_file.exists():
+            os.remove(hyperopt.data_pickle_file)
+
+    return {
+        'strategy': strategy,
+        'lossFunction': loss_function,
+        'timeframe': timeframe,
+        'results_file': str(hyperopt.results_file),
+        'log_file': str(log_file),
+        'runtime': time.time() - start,
+        'cache_stats': cache.stats() if cache else None,
+        'signal_cache_stats': signal_cache_stats,
+        'curve': stopper.curve if stopper else None,
+        'stopped': stopper.stopped if stopper else False,
+    }
+
+
+def daemon_request(socket_path, request):
+    """Send a request to the hyperopt daemon and wait for its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode() + b'\n')
+        line = connection.makefile('r').readline()
+    if not line:
+        raise ConnectionError(f"No response from the hyperopt daemon {socket_path}")
+    response = json.loads(line)
+    if 'error' in response:
+        raise RuntimeError(response['error'])
+    return response
+
+
+def submit_daemon_job(args, strategy, loss_function, timeframe, hyperopt_jobs, epochs=None,
+                      previous_results=(), rung=None):
+    """Run one hyperopt in the hyperopt daemon (same arguments and result as run_hyperopt_job)."""
+    return daemon_request(args.daemon, {
+        'command': 'run',
+        'cwd': os.getcwd(),
+        'args': vars(args),
+        'strategy': strategy,
+        'loss_function': loss_function,
+        'timeframe': timeframe,
+        'hyperopt_jobs': hyperopt_jobs,
+        'epochs': epochs,
+        'previous_results': list(previous_results),
+        'rung': rung,
+    })['job']
+
+
+def job_executor(args, nb_workers):
+    """Fork pool running the jobs, or threads submitting them to the hyperopt daemon."""
+    if args.daemon:
+        return ThreadPoolExecutor(max_workers=nb_workers), submit_daemon_job
+    # Fork after the data is loaded so that the jobs share it
+    context = multiprocessing.get_context('fork')
+    return ProcessPoolExecutor(max_workers=nb_workers, mp_context=context), run_hyperopt_job
+
+
+def extract_job_result(job, csv_file_name, skip_existing=False):
+    """Put the best result of a finished job in the CSV file. Return False if there is no result."""
+    try:
+        rows = extract_file(job['results_file'], best=True, strategie=job['strategy'],
+                            loss_function=job['lossFunction'], timeframe=job['timeframe'])
+    except (OSError, ValueError, KeyError):
+        rows = []
+    if not rows:
+        logger.error(f"No result found in {job['results_file']}")
+        return False
+
+    write_rows(rows, csv_file_name, skip_existing)
+    return True
+
+
+def record_job_result(ledger, args, job, skip_existing=False):
+    """Put the result of a finished job in the output, then mark it done (failed without result)."""
+    key = (job['strategy'], job['lossFunction'], job['timeframe'], args.epochs)
+    if not extract_job_result(job, args.output, skip_existing):
+        ledger.fail(*key, f"No result found in {job['results_file']}")
+        return False
+    ledger.done(*key, args.output)
+    return True
+
+
+def run_sweep(args):
+    nb_cpu = args.jobs or os.cpu_count() or 1
+    failures = []
+
+    ledger = SweepLedger(args.ledger or os.path.join(args.userdir, 'hyperopt_sweep_ledger.sqlite'),
+                         sweep_settings(args))
+    for strategy in args.strategy:
+        # Resume: skip the jobs done by a previous run of the sweep. The jobs interrupted after
+        # their hyperopt only get their result extracted again, without the rows already written
+        todo = {timeframe: [] for timeframe in args.timeframe}
+        for timeframe in args.timeframe:
+            for loss_function in args.loss:
+                previous = None if args.restart else ledger.job(strategy, loss_function, timeframe, args.epochs)
+                if previous is not None and previous['status'] == DONE:
+                    continue
+                if previous is not None and previous['status'] == EXTRACTING:
+                    logger.info(f"{job_name(strategy, loss_function, timeframe)}: extracting {previous['results_file']} again")
+                    job = {'strategy': strategy, 'lossFunction': loss_function, 'timeframe': timeframe,
+                           'results_file': previous['results_file']}
+                    if record_job_result(ledger, args, job, skip_existing=True):
+                        continue
+                todo[timeframe].append(loss_function)
+        for timeframe, loss_functions in todo.items():
+            if not loss_functions:
+                logger.info(f"{strategy} {timeframe}: all jobs already done")
+        timeframes = [timeframe for timeframe, loss_functions in todo.items() if loss_functions]
+        if args.derive_timeframes and timeframes and not args.daemon:
+            logger.info(f"Loading {strategy} {', '.join(timeframes)} data")
+            preload_derived_data(args, strategy, timeframes)
+
+        for timeframe in timeframes:
+            loss_functions = todo[timeframe]
+            nb_workers = max(1, min(len(loss_functions), nb_cpu))
+            hyperopt_jobs = max(1, nb_cpu // nb_workers)
+
+            if (strategy, timeframe) not in _preloaded and not args.daemon:
+                logger.info(f"Loading {strategy} {timeframe} data")
+                preload_data(args, strategy, timeframe)
+
+            executor, run_job = job_executor(args, nb_workers)
+            with executor:
+                futures = {}
+                for loss_function in loss_functions:
+                    ledger.start(strategy, loss_function, timeframe, args.epochs)
+                    future = executor.submit(run_job, args, strategy, loss_function, timeframe, hyperopt_jobs)
+                    futures[future] = loss_function
+
+                for future in as_completed(futures):
+                    loss_function = futures[future]
+                    name = job_name(strategy, loss_function, timeframe)
+                    try:
+                        job = future.result()
+                    except Exception as e:
+                        logger.exception(f"{name} failed")
+                        ledger.fail(strategy, loss_function, timeframe, args.epochs, repr(e))
+                        failures.append(name)
+                        continue
+                    logger.info(f"{name} done in {job['runtime']:.1f}s -> {job['results_file']}")
+                    if job['cache_stats']:
+                        logger.info(f"{name} indicator cache: {job['cache_stats']['hits']} hits, "
+                                    f"{job['cache_stats']['misses']} misses")
+                    if job.get('signal_cache_stats'):
+                        logger.info(f"{name} signal cache: {job['signal_cache_stats']['hits']} hits, "
+                                    f"{job['signal_cache_stats']['misses']} misses")
+                    ledger.finished(strategy, loss_function, timeframe, args.epochs, job['runtime'],
+                                    job['results_file'], job['log_file'])
+                    if not record_job_result(ledger, args, job):
+                        failures.append(name)
+
+            _preloaded.pop((strategy, timeframe), None)
+
+    ledger.close()
+    return failures
+
+
+def run_adaptive_sweep(args):
+    """Share the epochs of the sweep between the runs in successive-halving rungs."""
+    nb_cpu = args.jobs or os.cpu_count() or 1
+    failures = []
+
+    runs = [(strategy, loss_function, timeframe) for strategy in args.strategy
+            for timeframe in args.timeframe for loss_function in args.loss]
+    for strategy in args.strategy:
+        if args.daemon:
+            # The hyperopt daemon loads the data itself
+            break
+        if args.derive_timeframes:
+            preload_derived_data(args, strategy, args.timeframe)
+        for timeframe in args.timeframe:
+            if (strategy, timeframe) not in _preloaded:
+                logger.info(f"Loading {strategy} {timeframe} data")
+                preload_data(args, strategy, timeframe)
+
+    scheduler = SuccessiveHalving(runs, args.epochs, args.eta)
+    results_files = {run: [] for run in runs}
+    while True:
+        rung = scheduler.next_rung()
+        if not rung:
+            break
+        logger.info(f"Rung {scheduler.rung}: {len(rung)} runs, {max(rung.values())} epochs each")
+
+        nb_workers = max(1, min(len(rung), nb_cpu))
+        hyperopt_jobs = max(1, nb_cpu // nb_workers)
+        executor, run_job = job_executor(args, nb_workers)
+        with executor:
+            futures = {
+                executor.submit(run_job, args, *run, hyperopt_jobs, epochs,
+                                list(results_files[run]), scheduler.rung): run
+                for run, epochs in rung.items()
+            }
+            for future in as_completed(futures):
+                run = futures[future]
+                name = job_name(*run)
+                try:
+                    job = future.result()
+                except Exception:
+                    logger.exception(f"{name} failed")
+                    failures.append(name)
+                    scheduler.report(run, [], stopped=True)
+                    continue
+                results_files[run].append(job['results_file'])
+                scheduler.report(run, job['curve'], job['stopped'])
+                logger.info(f"{name} {len(job['curve'])} epochs in {job['runtime']:.1f}s"
+                            f"{' (plateau)' if job['stopped'] else ''}, best objective {scheduler.best(run):.5f}")
+
+    logger.info(f"{scheduler.used} of {scheduler.budget} epochs used")
+
+    # Best result of each run over all its rungs
+    for run, run_results_files in results_files.items():
+        strategy, loss_function, timeframe = run
+        rows = []
+        for results_file in run_results_files:
+            try:
+                rows += extract_file(results_file, best=True, strategie=strategy,
+                                     loss_function=loss_function, timeframe=timeframe)
+            except (OSError, ValueError, KeyError):
+                logger.error(f"No result found in {results_file}")
+        if rows:
+            best = min(rows, key=lambda row: float(row['objective']))
+            best['nb_epoch'] = str(len(scheduler.curves[run]))
+            write_rows([best], args.output)
+
+    _preloaded.clear()
+    return failures
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Run a hyperopt sweep in a single process.')
+    parser.add_argument('-c', '--config', nargs='+', default=['user_data/config.json'], help='Freqtrade configuration file(s) (Default: user_data/config.json)')
+    parser.add_argument('-u', '--userdir', default='user_data', help='Freqtrade user data directory (Default: user_data)')
+    parser.add_argument('-s', '--strategy', nargs='+', default=DEFAULT_STRATEGIES, help='Strategies to optimize')
+    parser.add_argument('-l', '--loss', nargs='+', default=DEFAULT_LOSS_FUNCTIONS, help='Loss functions to use')
+    parser.add_argument('-t', '--timeframe', nargs='+', default=DEFAULT_TIMEFRAMES, help='Timeframes to use')
+    parser.add_argument('-e', '--epochs', type=int, default=100, help='Number of epochs per run (Default: 100)')
+    parser.add_argument('--spaces', nargs='+', help='Hyperopt spaces to optimize (Default: freqtrade default)')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of cores to use (Default: all available cores)')
+    parser.add_argument('-o', '--output', default='./hyperopt_res.csv', help='Output file (CSV, or SQLite results store if .sqlite/.db)')
+    parser.add_argument('--indicator-cache', help='Indicator cache directory (Default: USERDIR/indicator_cache)')
+    parser.add_argument('--cache-size', type=int, default=2048, help='Maximal size of the indicator cache in MB (Default: 2048)')
+    parser.add_argument('--no-indicator-cache', action='store_true', help='Always compute the indicators')
+    parser.add_argument('--signal-cache', type=int, default=0, help='Signals of distinct buy/sell parameters kept per hyperopt worker, e.g. 1 for the spaces without buy and sell (Default: 0, disabled)')
+    parser.add_argument('--fingerprint-cache', type=int, default=0, help='Backtests of distinct signal fingerprints kept per hyperopt worker, e.g. 256 (Default: 0, disabled)')
+    parser.add_argument('--ohlcv-store', help='Read the candles from this store (see ohlcv_store.py) instead of the data files')
+    parser.add_argument('--ledger', help='Job ledger of the sweep (Default: USERDIR/hyperopt_sweep_ledger.sqlite)')
+    parser.add_argument('--restart', action='store_true', help='Run all the jobs again, even the ones already done')
+    parser.add_argument('--derive-timeframes', action='store_true', help='Load the finest timeframe only and resample the other ones from it')
+    parser.add_argument('--adaptive', action='store_true', help='Share the epochs (runs x EPOCHS) between the runs still improving (no ledger)')
+    parser.add_argument('--eta', type=int, default=3, help='Adaptive: fraction of the runs kept after each rung (Default: 3)')
+    parser.add_argument('--patience', type=int, default=30, help='Adaptive: epochs without improvement before stopping a run (Default: 30)')
+    parser.add_argument('--min-delta', type=float, default=0.001, help='Adaptive: minimal relative improvement of the objective (Default: 0.001)')
+    parser.add_argument('--daemon', metavar='SOCKET', help='Run the jobs in the hyperopt daemon listening on this socket (see hyperopt_daemon.py)')
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    failures = run_adaptive_sweep(args) if args.adaptive else run_sweep(args)
+    if failures:
+        sys.exit('Failed runs: ' + ', '.join(failures))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+#
+# Content-addressed on-disk cache of the dataframes populated by a strategy.
+#
+# The key of a cached frame combines the pair, the timeframe, a hash of the candle data
+# and a hash of the source of the strategy `populate_indicators` and of the helper modules
+# it may call (the modules of user_data imported by the strategy). The values are stored
+# as one float64 block per frame and memory-mapped when read back, so that several
+# processes using the same frame share its pages. The least recently used frames are
+# evicted when the cache grows bigger than its maximal size.
+#
+# usage: indicator_cache.py [-h] [--clear] [CACHE_DIR]
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+logger = logging.getLogger(__name__)
+
+
+def data_hash(dataframe):
+    """Hash of the candles (date range and OHLCV values) of a dataframe."""
+    digest = hashlib.sha1()
+    digest.update(dataframe['date'].values.astype('datetime64[ns]').view('int64').tobytes())
+    for column in ['open', 'high', 'low', 'close', 'volume']:
+        digest.update(np.ascontiguousarray(dataframe[column].values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def helper_module_files(function):
+    """
+    Source files of the modules used by the module of a function, and by these modules, in the
+    user data directory of the function (e.g. user_data for user_data/strategies/strategy.py):
+    the helper modules of a strategy or hyperopt.
+    """
+    own_file = os.path.abspath(inspect.getfile(function))
+    user_data_dir = os.path.dirname(os.path.dirname(own_file)) + os.sep
+    files = set()
+    namespaces = [function.__globals__]
+    while namespaces:
+        for value in namespaces.pop().values():
+            module = value if inspect.ismodule(value) else inspect.getmodule(value)
+            path = getattr(module, '__file__', None)
+            if not path:
+                continue
+            path = os.path.abspath(path)
+            if path == own_file or path in files or not path.startswith(user_data_dir):
+                continue
+            files.add(path)
+            namespaces.append(vars(module))
+    return sorted(files)
+
+
+def indicators_source_hash(strategy):
+    """Hash of the code used by the strategy to populate the indicators."""
+    # Hyperopt replaces advise_indicators on the instance when the hyperopt class populates them
+    populate = strategy.__dict__.get('advise_indicators', type(strategy).populate_indicators)
+    try:
+        source = inspect.getsource(populate).encode()
+    except (OSError, TypeError):
+        code = populate.__code__
+        source = code.co_code + repr(code.co_consts).encode()
+    digest = hashlib.sha1(source)
+    # The helpers called by populate_indicators (e.g. bbrsi_indicators.bollinger_bands)
+    for path in helper_module_files(getattr(populate, '__func__', populate)):
+        with open(path, 'rb') as helper:
+            digest.update(helper.read())
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, pair, timeframe, dataframe, source_hash):
+        key = f"{pair}|{timeframe}|{data_hash(dataframe)}|{source_hash}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_or_populate(self, strategy, pair, timeframe, dataframe):
+        """Return the populated frame of the pair, from the cache when available."""
+        key = self.key(pair, timeframe, dataframe, indicators_source_hash(strategy))
+
+        populated = self.load(key)
+        if populated is not None:
+            self.hits += 1
+            return populated
+
+        self.misses += 1
+        populated = strategy.advise_indicators(dataframe.copy(), {'pair': pair})
+        self.store(key, populated, pair, timeframe)
+        return populated
+
+    def populate_all(self, strategy, timeframe, data):
+        return {pair: self.get_or_populate(strategy, pair, timeframe, pair_data)
+                for pair, pair_data in data.items()}
+
+    def install(self, strategy, timeframe):
+        """Make the strategy populate its indicators through the cache."""
+        def populate_all(data):
+            return self.populate_all(strategy, timeframe, data)
+
+        # Method renamed in the recent freqtrade versions
+        for name in ['ohlcvdata_to_dataframe', 'advise_all_indicators']:
+            if hasattr(strategy, name):
+                setattr(strategy, name, populate_all)
+
+    def load(self, key):
+        entry = self.cache_dir / key
+        try:
+            with open(entry / 'meta.json', 'r') as meta_file:
+                meta = json.load(meta_file)
+            # Copy-on-write mapping: the pages are shared until a column is modified
+            values = np.load(entry / 'values.npy', mmap_mode='c')
+            dates = np.load(entry / 'date.npy')
+        except (OSError, ValueError):
+            return None
+
+        # Touch the entry for the LRU eviction
+        os.utime(entry / 'meta.json')
+
+        columns = [column for column in meta['columns'] if column != 'date']
+        dataframe = pd.DataFrame(values.T, columns=columns, copy=False)
+        for column, dtype in meta['dtypes'].items():
+            if dtype != 'float64':
+                dataframe[column] = dataframe[column].astype(dtype)
+        if 'date' in meta['columns']:
+            dates = pd.to_datetime(dates, unit='ns', utc=True).astype(meta['date_dtype'])
+            dataframe.insert(meta['columns'].index('date'), 'date', dates)
+        return dataframe
+
+    def store(self, key, dataframe, pair, timeframe):
+        entry = self.cache_dir / key
+        if entry.exists():
+            return
+
+        columns = [column for column in dataframe.columns if column != 'date']
+        dtypes = {column: str(dataframe[column].dtype) for column in columns}
+        if any(not np.issubdtype(dataframe[column].dtype, np.number)
+               and dataframe[column].dtype != bool for column in columns):
+            logger.debug(f"Not caching {pair} {timeframe}: non numeric columns")
+            return
+
+        values = np.empty((len(columns), len(dataframe)), dtype=np.float64)
+        for i, column in enumerate(columns):
+            values[i] = dataframe[column].values
+        dates = dataframe['date'].values.astype('datetime64[ns]').view('int64')
+
+        # Write in a temporary directory then rename it: concurrent writers of the same key are fine
+        tmp_entry = self.cache_dir / f".{key}.{os.getpid()}.tmp"
+        tmp_entry.mkdir(parents=True, exist_ok=True)
+        np.save(tmp_entry / 'values.npy', values)
+        np.save(tmp_entry / 'date.npy', dates)
+        with open(tmp_entry / 'meta.json', 'w') as meta_file:
+            json.dump({
+                'pair': pair,
+                'timeframe': timeframe,
+                'columns': list(dataframe.columns),
+                'dtypes': dtypes,
+                'date_dtype': str(dataframe['date'].dtype),
+                'created': time.time(),
+            }, meta_file)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        self.evict()
+
+    def entries(self):
+        """List (mtime, size, path) of the cached frames."""
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.name.startswith('.') or not entry.is_dir():
+                continue
+            try:
+                mtime = (entry / 'meta.json').stat().st_mtime
+                size = sum(f.stat().st_size for f in entry.iterdir())
+            except OSError:
+                continue
+            entries.append((mtime, size, entry))
+        return entries
+
+    def evict(self):
+        """Remove the least recently used frames until the cache fits in max_bytes."""
+        entries = sorted(self.entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total_size <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, _, entry in self.entries():
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'size': sum(size for _, size, _ in entries),
+        }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Show or clear the indicator cache.')
+    parser.add_argument('cache_dir', metavar='CACHE_DIR', type=str, nargs='?', default='user_data/indicator_cache', help='Cache directory (Default: user_data/indicator_cache)')
+    parser.add_argument('--clear', action='store_true', help='Remove all the cached frames')
+
+    args = parser.parse_args(argv)
+
+    cache = IndicatorCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+
+    stats = cache.stats()
+    print(f"{stats['entries']} cached frames, {stats['size'] / 1024 ** 2:.1f} MB")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
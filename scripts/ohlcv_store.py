@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+#
+# Pack the candles of all the pairs and timeframes in one memory-mapped columnar store.
+#
+# The store is a directory with:
+# - ohlcv.bin: the dates of all the candles (int64 ns) followed by the open, high, low, close
+#   and volume columns (float64), each column holding the candles of all the pairs/timeframes
+# - index.json: the number of candles and, for each pair and timeframe, the offset/length of its candles
+#
+# The backtests and the hyperopt workers (see the --ohlcv-store option of hyperopt_sweep.py) map the file instead of parsing the data files, so the
+# candles are shared through the OS page cache instead of being copied in each process.
+# Packing again replaces the files atomically (data file, then index): the processes mapping
+# the previous data file keep reading the previous candles.
+#
+# usage: ohlcv_store.py [-h] [-d DATADIR] [-c CONFIG | -p PAIRS_FILE] [-t TIMEFRAMES [TIMEFRAMES ...]]
+#                       [--data-format DATA_FORMAT] [-o OUTPUT]
+
+import os
+import sys
+import json
+import shutil
+import pathlib
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from freqtrade.configuration import TimeRange
+from freqtrade.data.history import get_timerange
+from freqtrade.data.history.idatahandler import get_datahandler
+from freqtrade.exchange import timeframe_to_seconds
+
+DATA_FILE = 'ohlcv.bin'
+INDEX_FILE = 'index.json'
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class OHLCVStore:
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        with open(self.path / INDEX_FILE, 'r') as index_file:
+            self.index = json.load(index_file)
+
+        rows = self.index['rows']
+        # A store being packed again may have its new data file but still the previous index
+        size = os.path.getsize(self.path / DATA_FILE)
+        if size != rows * 8 * len(self.index['columns']):
+            raise ValueError(f"{self.path / DATA_FILE} does not match {self.path / INDEX_FILE} "
+                             f"({size} bytes for {rows} candles), is the store being packed?")
+        # Copy-on-write mapping: the pages are shared by all the processes reading the store
+        self._dates = np.memmap(self.path / DATA_FILE, dtype=np.int64, mode='c', offset=0, shape=(rows,))
+        self._prices = np.memmap(self.path / DATA_FILE, dtype=np.float64, mode='c', offset=rows * 8,
+                                 shape=(len(PRICE_COLUMNS), rows))
+
+    def pairs(self, timeframe):
+        return [pair for pair, timeframes in self.index['pairs'].items() if timeframe in timeframes]
+
+    def has(self, pair, timeframe):
+        return timeframe in self.index['pairs'].get(pair, {})
+
+    def load(self, pair, timeframe, start=None, stop=None):
+        """
+        Candles of a pair, optionally between start and stop (datetime or timestamp in seconds).
+        The price columns of the returned DataFrame are views into the mapped file.
+        """
+        entry = self.index['pairs'][pair][timeframe]
+        first, last = entry['offset'], entry['offset'] + entry['length']
+
+        dates = self._dates[first:last]
+        if start is not None:
+            first += int(np.searchsorted(dates, _to_ns(start), side='left'))
+        if stop is not None:
+            last = entry['offset'] + int(np.searchsorted(dates, _to_ns(stop), side='right'))
+
+        dataframe = pd.DataFrame(self._prices[:, first:last].T, columns=PRICE_COLUMNS, copy=False)
+        dataframe.insert(0, 'date', pd.to_datetime(self._dates[first:last], unit='ns', utc=True))
+        return dataframe
+
+    def load_all(self, pairs, timeframe, start=None, stop=None):
+        return {pair: self.load(pair, timeframe, start, stop) for pair in pairs if self.has(pair, timeframe)}
+
+
+def _to_ns(value):
+    if isinstance(value, (int, float)):
+        return int(value * 10 ** 9)
+    return pd.Timestamp(value).value
+
+
+def load_bt_data(store, backtesting):
+    """
+    Replacement of Backtesting.load_bt_data reading the candles from the store:
+    same pairs, timerange and startup candles as the data files would give.
+    """
+    config = backtesting.config
+    timeframe = backtesting.timeframe
+    timerange = TimeRange.parse_timerange(None if config.get('timerange') is None
+                                          else str(config.get('timerange')))
+
+    start = stop = None
+    if timerange.starttype == 'date':
+        start = timerange.startts - timeframe_to_seconds(timeframe) * backtesting.required_startup
+    if timerange.stoptype == 'date':
+        stop = timerange.stopts
+
+    pairs = backtesting.pairlists.whitelist
+    missing = [pair for pair in pairs if not store.has(pair, timeframe)]
+    if missing:
+        raise ValueError(f"No {timeframe} candles in {store.path} for {', '.join(missing)}")
+
+    data = store.load_all(pairs, timeframe, start, stop)
+    min_date, max_date = get_timerange(data)
+    timerange.adjust_start_if_necessary(timeframe_to_seconds(timeframe), backtesting.required_startup, min_date)
+    return data, timerange
+
+
+def pack(datadir, pairs, timeframes, output, data_format='json'):
+    """Write the candles of the pairs/timeframes found in datadir to the store in output."""
+    data_handler = get_datahandler(pathlib.Path(datadir), data_format=data_format)
+    output = pathlib.Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    index = {'columns': ['date'] + PRICE_COLUMNS, 'rows': 0, 'pairs': {}}
+
+    # Write each column in its own temporary file, then concatenate them: one frame in memory at a time
+    with tempfile.TemporaryDirectory(dir=output) as tmp_dir:
+        column_files = {column: open(os.path.join(tmp_dir, column), 'wb') for column in index['columns']}
+        for pair in pairs:
+            for timeframe in timeframes:
+                # Same candles as the ones loaded by backtesting (gaps filled, incomplete last candle dropped)
+                ohlcv = data_handler.ohlcv_load(pair, timeframe, fill_missing=True, drop_incomplete=True,
+                                                warn_no_data=False)
+                if ohlcv.empty:
+                    continue
+                dates = ohlcv['date'].values.astype('datetime64[ns]').view(np.int64)
+                column_files['date'].write(np.ascontiguousarray(dates).tobytes())
+                for column in PRICE_COLUMNS:
+                    column_files[column].write(ohlcv[column].to_numpy(dtype=np.float64).tobytes())
+
+                index['pairs'].setdefault(pair, {})[timeframe] = {'offset': index['rows'], 'length': len(ohlcv)}
+                index['rows'] += len(ohlcv)
+                print(f"{pair} {timeframe}: {len(ohlcv)} candles")
+
+        # The new files replace the previous ones atomically: the processes mapping the previous
+        # data file keep reading it, and an interrupted pack leaves the previous store unchanged.
+        # Data first, so that the index never describes a data file which is not there yet.
+        with open(os.path.join(tmp_dir, DATA_FILE), 'wb') as data_file:
+            for column in index['columns']:
+                column_files[column].close()
+                with open(os.path.join(tmp_dir, column), 'rb') as column_file:
+                    shutil.copyfileobj(column_file, data_file)
+            data_file.flush()
+            os.fsync(data_file.fileno())
+        with open(os.path.join(tmp_dir, INDEX_FILE), 'w') as index_file:
+            json.dump(index, index_file, indent=1)
+            index_file.flush()
+            os.fsync(index_file.fileno())
+
+        os.replace(os.path.join(tmp_dir, DATA_FILE), output / DATA_FILE)
+        os.replace(os.path.join(tmp_dir, INDEX_FILE), output / INDEX_FILE)
+
+    return index
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Pack the candles of all the pairs and timeframes in one memory-mapped store.')
+    parser.add_argument('-d', '--datadir', default='user_data/data/binance', help='Data directory (Default: user_data/data/binance)')
+    pairs_group = parser.add_mutually_exclusive_group()
+    pairs_group.add_argument('-c', '--config', help='Take the pairs from the pair_whitelist of this configuration file')
+    pairs_group.add_argument('-p', '--pairs-file', help='Take the pairs from this JSON list (Default: DATADIR/pairs.json)')
+    parser.add_argument('-t', '--timeframes', nargs='+', default=['5m', '15m', '1h', '1d'], help='Timeframes to pack (Default: 5m 15m 1h 1d)')
+    parser.add_argument('--data-format', default='json', help='Format of the data files (Default: json)')
+    parser.add_argument('-o', '--output', help='Store directory (Default: DATADIR/ohlcv_store)')
+
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, 'r') as config_file:
+            pairs = json.load(config_file)['exchange']['pair_whitelist']
+    else:
+        with open(args.pairs_file or os.path.join(args.datadir, 'pairs.json'), 'r') as pairs_file:
+            pairs = json.load(pairs_file)
+
+    output = args.output or os.path.join(args.datadir, 'ohlcv_store')
+    index = pack(args.datadir, pairs, args.timeframes, output, args.data_format)
+    print(f"{index['rows']} candles of {len(index['pairs'])} pairs packed in {output}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,85 @@
+#
+# Bit-packed buy/sell signals: one bit per candle in 64 bit words (numpy.packbits).
+#
+# A signal column of T candles takes T / 8 bytes instead of 8 T for an int64 column, so the
+# caches holding the signals of many candidate points (hyperopt_grid.py) are 64 times smaller.
+# Bit i of word j is the candle 64 j + i: the set candles are found by skipping the zero words
+# first, which is fast for the sparse entry/exit signals.
+#
+# Usage:
+#   signals = PackedSignals.from_bool(dataframe['buy'].to_numpy() == 1)
+#   words = pack(matrix)  # rows of a N x T boolean matrix, see PackedSignals(words[i], T)
+
+import numpy as np
+
+WORD_BITS = 64
+# Little-endian words whatever the platform, so that bit i of word j is the candle 64 j + i
+WORD_DTYPE = np.dtype('<u8')
+
+
+def pack(signals):
+    """Pack the boolean signals (last axis) in 64 bit words."""
+    signals = np.asarray(signals, dtype=bool)
+    length = signals.shape[-1]
+    nb_words = (length + WORD_BITS - 1) // WORD_BITS
+    padded = np.zeros(signals.shape[:-1] + (nb_words * WORD_BITS,), dtype=bool)
+    padded[..., :length] = signals
+    return np.packbits(padded, axis=-1, bitorder='little').view(WORD_DTYPE)
+
+
+class PackedSignals:
+    """Boolean signals of `length` candles."""
+
+    def __init__(self, words, length):
+        self.words = words
+        self.length = length
+
+    @classmethod
+    def from_bool(cls, signals):
+        return cls(pack(signals), len(signals))
+
+    @classmethod
+    def zeros(cls, length):
+        return cls(np.zeros((length + WORD_BITS - 1) // WORD_BITS, dtype=WORD_DTYPE), length)
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        return self.length == other.length and np.array_equal(self.words, other.words)
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    def set(self, index):
+        self.words[index // WORD_BITS] |= WORD_DTYPE.type(1) << WORD_DTYPE.type(index % WORD_BITS)
+
+    def test(self, index):
+        return bool((self.words[index // WORD_BITS] >> WORD_DTYPE.type(index % WORD_BITS)) & WORD_DTYPE.type(1))
+
+    def count(self):
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    def any(self):
+        return bool(self.words.any())
+
+    def set_indices(self):
+        """Indices of the set candles, in order. The zero words are skipped."""
+        nonzero = np.flatnonzero(self.words)
+        bits = np.unpackbits(self.words[nonzero].view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+        word_indices, bit_indices = np.nonzero(bits)
+        return nonzero[word_indices] * WORD_BITS + bit_indices
+
+    def __iter__(self):
+        return iter(self.set_indices().tolist())
+
+    def to_bool(self):
+        return np.unpackbits(self.words.view(np.uint8), count=self.length, bitorder='little').view(bool)
+
+    def to_column(self):
+        """int8 signal column (1 on the set candles): a view of the unpacked bits, 8 times smaller than int64."""
+        return np.unpackbits(self.words.view(np.uint8), count=self.length, bitorder='little').view(np.int8)
+
+    def tobytes(self):
+        return self.words.tobytes()
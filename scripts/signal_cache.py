@@ -0,0 +1,112 @@
+#
+# Cache of the buy/sell signals of the hyperopt epochs, keyed by the signal parameters.
+#
+# Each epoch of a hyperopt runs the buy and sell signals of all the pairs again
+# (advise_buy / advise_sell on the populated frames, then the conversion of the frames to the
+# rows of the trade simulation) before simulating the trades. The parameters of the roi,
+# stoploss and trailing spaces do not change these signals, and the parameters of the buy/sell
+# spaces only choose among indicators already populated: the rows of the last epochs are kept,
+# keyed by the values of the buy/sell parameters, and an epoch with the same values only
+# simulates the trades. In a roi/stoploss/trailing hyperopt, only the first epoch computes
+# the signals.
+#
+# The epochs run in joblib worker processes, which receive the hyperopt pickled with each
+# batch of epochs: the cache is kept in class attributes of SignalCache (the class is pickled
+# by reference), so that it lives as long as the worker process.
+#
+# Only the epochs with the buy/sell parameters of a previous epoch hit the cache: it is opt-in
+# (--signal-cache in hyperopt_sweep.py), for the hyperopts without the buy and sell spaces. The
+# epochs report whether they hit it, and install() returns the hits / misses of the run.
+#
+# Usage (see hyperopt_sweep.py):
+#   stats = SignalCache.install(hyperopt, max_entries=1)
+
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def data_key(processed):
+    """Cheap identity of the populated frames of a backtest: pairs, lengths and date ranges."""
+    return tuple((pair, len(dataframe), dataframe['date'].iloc[0], dataframe['date'].iloc[-1])
+                 if len(dataframe) else (pair, 0) for pair, dataframe in sorted(processed.items()))
+
+
+def signal_params_key(hyperopt, raw_params):
+    """Values of the buy/sell space parameters of an epoch."""
+    # The spaces are only known once the hyperopt started
+    signal_names = {dimension.name for dimension in
+                    getattr(hyperopt, 'buy_space', []) + getattr(hyperopt, 'sell_space', [])}
+    return tuple((dimension.name, value) for dimension, value in zip(hyperopt.dimensions, raw_params)
+                 if dimension.name in signal_names)
+
+
+class SignalCache:
+    """Rows of the trade simulation for the last max_entries distinct buy/sell parameter values."""
+
+    # (strategy, data key, signal key) -> rows of the trade simulation of each pair
+    entries = OrderedDict()
+    hits = 0
+    misses = 0
+    # Values of the buy/sell parameters of the current epoch
+    signal_key = ()
+
+    @classmethod
+    def get(cls, key):
+        rows = cls.entries.get(key)
+        if rows is None:
+            cls.misses += 1
+            return None
+        cls.hits += 1
+        cls.entries.move_to_end(key)
+        return rows
+
+    @classmethod
+    def put(cls, key, rows, max_entries):
+        cls.entries[key] = rows
+        while len(cls.entries) > max_entries:
+            cls.entries.popitem(last=False)
+
+    @classmethod
+    def install(cls, hyperopt, max_entries=1):
+        """
+        Make the backtests of the hyperopt epochs reuse the signals of the same buy/sell parameters.
+        Return the hits / misses of the epochs of the hyperopt (None if not installed).
+        """
+        backtesting = hyperopt.backtesting
+        if not hasattr(backtesting, '_get_ohlcv_as_lists'):
+            logger.warning("Signal cache not installed: unsupported freqtrade version")
+            return None
+
+        generate_optimizer = hyperopt.generate_optimizer
+        print_results = hyperopt.print_results
+        get_ohlcv_as_lists = backtesting._get_ohlcv_as_lists
+        strategy_name = type(backtesting.strategy).__name__
+        # Counted in the hyperopt process: the counters of the class are the ones of each worker
+        stats = {'hits': 0, 'misses': 0}
+
+        def generate_optimizer_with_signal_key(raw_params, *args, **kwargs):
+            cls.signal_key = signal_params_key(hyperopt, raw_params)
+            hits = cls.hits
+            results = generate_optimizer(raw_params, *args, **kwargs)
+            results['signal_cache_hit'] = cls.hits > hits
+            return results
+
+        def print_results_and_count(results):
+            # print_results runs before the epoch is saved: the flag is not saved with it
+            stats['hits' if results.pop('signal_cache_hit', False) else 'misses'] += 1
+            print_results(results)
+
+        def get_cached_ohlcv_as_lists(processed):
+            key = (strategy_name, data_key(processed), cls.signal_key)
+            rows = cls.get(key)
+            if rows is None:
+                rows = get_ohlcv_as_lists(processed)
+                cls.put(key, rows, max_entries)
+            return rows
+
+        hyperopt.generate_optimizer = generate_optimizer_with_signal_key
+        hyperopt.print_results = print_results_and_count
+        backtesting._get_ohlcv_as_lists = get_cached_ohlcv_as_lists
+        return stats
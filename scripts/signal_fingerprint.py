@@ -0,0 +1,155 @@
+#
+# Memoized backtests of the hyperopt epochs, keyed by a fingerprint of their signals.
+#
+# Many points of the buy/sell spaces give the same signals: every rsi value when the rsi is
+# disabled, or thresholds which are not crossed differently on the data. The backtest of an
+# epoch only depends on its buy/sell signals and on the roi / stoploss / trailing settings, so
+# the fingerprint of an epoch hashes the packed buy and sell bits of all the pairs with these
+# settings, and an epoch whose fingerprint was already backtested gets the memoized results
+# (and therefore the same loss) instead of simulating the same trades again.
+#
+# The strategies overriding the custom hooks of IStrategy (custom_stoploss, custom_sell, ...)
+# or using protections are not supported: their trades may depend on other parameters, and
+# the cache is not installed for them.
+#
+# The fingerprint of the signals of the same buy/sell parameter values is remembered too, so
+# that the epochs of a roi/stoploss/trailing hyperopt do not compute their signals to get it.
+# As in signal_cache.py, the memos are class attributes so that they last as long as the
+# joblib worker processes running the epochs.
+#
+# Usage (see hyperopt_sweep.py):
+#   FingerprintCache.install(hyperopt, max_entries=256)
+
+import hashlib
+import logging
+from collections import OrderedDict
+
+from freqtrade.strategy.interface import IStrategy
+
+from packed_signals import PackedSignals
+from signal_cache import data_key, signal_params_key
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_COLUMNS = ['buy', 'sell']
+# Hooks of IStrategy which may change the trades of the same signals and exit settings
+CUSTOM_HOOKS = ['custom_stoploss', 'custom_sell', 'confirm_trade_entry', 'confirm_trade_exit',
+                'custom_stake_amount', 'custom_entry_price', 'custom_exit_price']
+
+
+def signals_fingerprint(analyzed):
+    """Hash of the packed buy and sell signals (and buy tags) of the analyzed frames of all the pairs."""
+    digest = hashlib.sha1()
+    for pair, dataframe in sorted(analyzed.items()):
+        digest.update(pair.encode())
+        signals = {column: PackedSignals.from_bool(dataframe[column].to_numpy() == 1) if column in dataframe
+                   else PackedSignals.zeros(len(dataframe)) for column in SIGNAL_COLUMNS}
+        for column in SIGNAL_COLUMNS:
+            digest.update(signals[column].tobytes())
+        if 'buy_tag' in dataframe:
+            tags = dataframe['buy_tag'].to_numpy()[signals['buy'].set_indices()]
+            digest.update('\0'.join(map(str, tags)).encode())
+    return digest.digest()
+
+
+def exit_settings(strategy):
+    """Settings of the strategy changing the trades of the same signals."""
+    return (tuple(sorted((str(key), value) for key, value in strategy.minimal_roi.items())),
+            strategy.stoploss, getattr(strategy, 'trailing_stop', False),
+            getattr(strategy, 'trailing_stop_positive', None),
+            getattr(strategy, 'trailing_stop_positive_offset', 0.0),
+            getattr(strategy, 'trailing_only_offset_is_reached', False))
+
+
+def custom_hooks(strategy):
+    """Custom hooks of IStrategy overridden by the strategy."""
+    return [name for name in CUSTOM_HOOKS
+            if hasattr(IStrategy, name) and getattr(type(strategy), name) is not getattr(IStrategy, name)]
+
+
+class FingerprintCache:
+    """Backtest results of the last max_entries distinct fingerprints."""
+
+    # fingerprint -> backtest output
+    results = OrderedDict()
+    # (strategy, data key, signal key) -> fingerprint of the signals, last max_entries
+    signal_fingerprints = OrderedDict()
+    hits = 0
+    misses = 0
+    # Values of the buy/sell parameters of the current epoch
+    signal_key = ()
+
+    @classmethod
+    def install(cls, hyperopt, max_entries=256):
+        """Memoize the backtests of the hyperopt epochs by fingerprint."""
+        backtesting = hyperopt.backtesting
+        strategy_name = type(backtesting.strategy).__name__
+        hooks = custom_hooks(backtesting.strategy)
+        if hooks or backtesting.config.get('enable_protections', False):
+            logger.warning(f"Fingerprint cache not installed: {strategy_name} uses "
+                           f"{', '.join(hooks) if hooks else 'protections'}")
+            return
+
+        generate_optimizer = hyperopt.generate_optimizer
+        backtest = backtesting.backtest
+
+        def generate_optimizer_with_signal_key(raw_params, *args, **kwargs):
+            cls.signal_key = signal_params_key(hyperopt, raw_params)
+            return generate_optimizer(raw_params, *args, **kwargs)
+
+        def analyze(processed):
+            strategy = backtesting.strategy
+            analyzed = {}
+            for pair, pair_data in processed.items():
+                pair_data = pair_data.copy()
+                pair_data['buy'] = 0
+                pair_data['sell'] = 0
+                analyzed[pair] = strategy.advise_sell(strategy.advise_buy(pair_data, {'pair': pair}), {'pair': pair})
+            return analyzed
+
+        def memoized_backtest(*args, **kwargs):
+            processed = kwargs['processed'] if 'processed' in kwargs else args[0]
+            strategy = backtesting.strategy
+            signals_key = (strategy_name, data_key(processed), cls.signal_key)
+
+            analyzed = None
+            signals = cls.signal_fingerprints.get(signals_key)
+            if signals is None:
+                analyzed = analyze(processed)
+                signals = signals_fingerprint(analyzed)
+                cls.signal_fingerprints[signals_key] = signals
+                while len(cls.signal_fingerprints) > max_entries:
+                    cls.signal_fingerprints.popitem(last=False)
+            else:
+                cls.signal_fingerprints.move_to_end(signals_key)
+
+            settings = tuple(sorted((name, repr(value)) for name, value in kwargs.items() if name != 'processed'))
+            fingerprint = (signals, exit_settings(strategy), repr(args[1:]), settings)
+            output = cls.results.get(fingerprint)
+            if output is not None:
+                cls.hits += 1
+                cls.results.move_to_end(fingerprint)
+            else:
+                cls.misses += 1
+                if analyzed is not None:
+                    # The backtest gets the signals computed for the fingerprint instead of computing them again
+                    advise_buy, advise_sell = strategy.advise_buy, strategy.advise_sell
+                    strategy.advise_buy = lambda dataframe, metadata: analyzed[metadata['pair']]
+                    strategy.advise_sell = lambda dataframe, metadata: dataframe
+                    try:
+                        output = backtest(*args, **kwargs)
+                    finally:
+                        strategy.advise_buy, strategy.advise_sell = advise_buy, advise_sell
+                else:
+                    output = backtest(*args, **kwargs)
+                cls.results[fingerprint] = output
+                while len(cls.results) > max_entries:
+                    cls.results.popitem(last=False)
+
+            # The caller may modify the results of its epoch
+            if isinstance(output, dict):
+                return {**output, 'results': output['results'].copy()}
+            return output.copy()
+
+        hyperopt.generate_optimizer = generate_optimizer_with_signal_key
+        backtesting.backtest = memoized_backtest
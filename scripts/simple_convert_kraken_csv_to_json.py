@@ -5,20 +5,35 @@
 
 """
 Convert CSV OHLCVT data from Kraken to JSON freqtrade format
+(or to the feather, parquet and hdf5 binary formats also supported by freqtrade)
 
-usage: simple_convert_kraken_csv_to_json.py [-h] [-f FIAT] [-o OUTPUT] [INPUT_PATH]
+usage: simple_convert_kraken_csv_to_json.py [-h] [-f FIAT] [-o OUTPUT] [-c CHUNKSIZE] [-j JOBS] [-i]
+                                            [--format {json,feather,parquet,hdf5}] [--compression COMPRESSION]
+                                            [--benchmark] [INPUT_PATH]
 
 """
 
 import sys
 import os
+import json
+import time
+import resource
+import tempfile
 import pandas as pd
 import re
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 CSV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'trades']
+JSON_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
 
-def convert_name(input_path, fiat_name, output_dir):
+# Output file extension of each format, as expected by the freqtrade data handlers
+FILE_EXTENSIONS = {'json': 'json', 'feather': 'feather', 'parquet': 'parquet', 'hdf5': 'h5'}
+
+# Source files already converted in incremental mode, one manifest per output directory
+MANIFEST_FILE = '.kraken_convert_manifest.json'
+
+def convert_name(input_path, fiat_name, output_dir, data_format='json'):
 
     filename = os.path.basename(input_path).rsplit('.', 1)[0]
 
@@ -33,12 +48,67 @@ def convert_name(input_path, fiat_name, output_dir):
         timeframe = int(timeframe / 60 / 24)
         unit = 'd'
 
-    json_file = crypto_name + '_' + fiat_name + '-' + str(timeframe) + unit + '.json'
+    output_file = crypto_name + '_' + fiat_name + '-' + str(timeframe) + unit + '.' + FILE_EXTENSIONS[data_format]
+
+    return os.path.join(output_dir, output_file)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def hdf5_key(output_file_path):
+    # Same key as the freqtrade HDF5 data handler: <pair>/ohlcv/tf_<timeframe>
+    pair, timeframe = os.path.basename(output_file_path).rsplit('.', 1)[0].rsplit('-', 1)
+    return f"{pair.replace('_', '/')}/ohlcv/tf_{timeframe}"
+
+
+def write_ohlcv(ohlcv_df, output_file_path, data_format='json', compression=None):
+    if data_format == 'json':
+        ohlcv_df.to_json(output_file_path, orient="values")
+    elif data_format == 'feather':
+        ohlcv_df.reset_index(drop=True).to_feather(output_file_path, compression=compression or 'lz4')
+    elif data_format == 'parquet':
+        ohlcv_df.reset_index(drop=True).to_parquet(output_file_path, compression=compression or 'snappy')
+    elif data_format == 'hdf5':
+        ohlcv_df.to_hdf(output_file_path, key=hdf5_key(output_file_path), mode='w', format='table',
+                        data_columns=['date'], complib=compression, complevel=9 if compression else 0)
+    else:
+        raise ValueError(f"Unknown data format {data_format}")
+
+
+def read_ohlcv(output_file_path, data_format='json'):
+    if data_format == 'json':
+        return pd.read_json(output_file_path, orient="values")
+    elif data_format == 'feather':
+        return pd.read_feather(output_file_path)
+    elif data_format == 'parquet':
+        return pd.read_parquet(output_file_path)
+    elif data_format == 'hdf5':
+        return pd.read_hdf(output_file_path, key=hdf5_key(output_file_path))
+    raise ValueError(f"Unknown data format {data_format}")
+
+
+def benchmark_load(ohlcv_df, output_file_path, data_format):
+    """Time the load of the written file and of the same candles in JSON format."""
+    start = time.perf_counter()
+    read_ohlcv(output_file_path, data_format)
+    load_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file_path = os.path.join(tmp_dir, 'benchmark.json')
+        write_ohlcv(ohlcv_df, json_file_path)
+        start = time.perf_counter()
+        read_ohlcv(json_file_path)
+        json_load_time = time.perf_counter() - start
+        json_size = os.path.getsize(json_file_path)
 
-    return os.path.join(output_dir, json_file)
+    return {'load_time': load_time, 'size': os.path.getsize(output_file_path),
+            'json_load_time': json_load_time, 'json_size': json_size}
 
 
-def convert_file(csv_file_path, json_file_path):
+def convert_file(csv_file_path, output_file_path, data_format='json', compression=None, benchmark=False):
     trades_df = pd.read_csv(csv_file_path, names=CSV_COLUMNS, header=None)
 
     trades_df['date'] = pd.to_datetime(trades_df['timestamp'], unit='s', utc=True)
@@ -46,17 +116,253 @@ def convert_file(csv_file_path, json_file_path):
     # Drop 0 volume rows
     trades_df = trades_df.dropna()
 
-    # Export to JSON freqtrade format
-    trades_df.loc[:, ['date', 'open', 'high', 'low', 'close', 'volume']].to_json(json_file_path, orient="values")
+    # Export to freqtrade format
+    ohlcv_df = trades_df.loc[:, JSON_COLUMNS]
+    write_ohlcv(ohlcv_df, output_file_path, data_format, compression)
+
+    if benchmark:
+        return len(ohlcv_df), benchmark_load(ohlcv_df, output_file_path, data_format)
+    return len(ohlcv_df), None
+
+
+def convert_file_streaming(csv_file_path, json_file_path, chunksize):
+    """Same output as convert_file, reading and writing chunksize rows at a time."""
+    nb_rows = 0
+
+    with open(json_file_path, 'w') as json_file:
+        json_file.write('[')
+        for trades_df in pd.read_csv(csv_file_path, names=CSV_COLUMNS, header=None, chunksize=chunksize):
+            trades_df['date'] = pd.to_datetime(trades_df['timestamp'], unit='s', utc=True)
+
+            # Drop 0 volume rows
+            trades_df = trades_df.dropna()
+            if trades_df.empty:
+                continue
+
+            # Append the rows of the chunk without the enclosing brackets of its JSON array
+            if nb_rows:
+                json_file.write(',')
+            json_file.write(trades_df.loc[:, JSON_COLUMNS].to_json(orient="values")[1:-1])
+            nb_rows += len(trades_df)
+        json_file.write(']')
+
+    return nb_rows
+
+
+def last_json_timestamp(json_file_path):
+    """Timestamp (ms) of the last candle of a freqtrade JSON file, read from the end of the file."""
+    with open(json_file_path, 'rb') as json_file:
+        json_file.seek(0, os.SEEK_END)
+        size = json_file.tell()
+        block_size = 4096
+        while True:
+            start = max(0, size - block_size)
+            json_file.seek(start)
+            tail = json_file.read()
+            row_start = tail.rfind(b'[')
+            if row_start >= 0 or start == 0:
+                break
+            block_size *= 2
+
+    timestamp = tail[row_start + 1:].split(b',')[0].strip()
+    return int(timestamp) if timestamp.isdigit() else None
+
+
+def manifest_path(json_file_path):
+    return os.path.join(os.path.dirname(json_file_path) or '.', MANIFEST_FILE)
+
+
+def load_manifest(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+    os.replace(tmp_path, path)
+
+
+def convert_file_incremental(csv_file_path, json_file_path, chunksize=None, manifest_entry=None):
+    """
+    Append to the JSON file only the candles newer than its last one.
+    The manifest entry (size, mtime, offset, last timestamp) of the previous conversion allows
+    to skip an unchanged CSV file, and to only read the end of a CSV file that has grown.
+    :return: (number of appended rows, new manifest entry)
+    """
+    stat = os.stat(csv_file_path)
+    last_timestamp = last_json_timestamp(json_file_path)
+
+    if manifest_entry and manifest_entry['last_timestamp'] == last_timestamp:
+        if manifest_entry['size'] == stat.st_size and manifest_entry['mtime'] == stat.st_mtime:
+            return 0, manifest_entry
+        offset = manifest_entry['offset'] if stat.st_size >= manifest_entry['size'] else 0
+    else:
+        offset = 0
+
+    nb_rows = 0
+    with open(csv_file_path, 'rb') as csv_file, open(json_file_path, 'r+b') as json_file:
+        # Remove the closing bracket of the JSON array to append the new rows
+        json_file.seek(0, os.SEEK_END)
+        json_size = json_file.tell()
+        json_file.seek(max(0, json_size - 64))
+        tail = json_file.read()
+        end = tail.rstrip()
+        if not end.endswith(b']'):
+            raise ValueError(f"{json_file_path} is not a JSON array")
+        has_rows = not end[:-1].rstrip().endswith(b'[')
+        cut = json_size - len(tail) + len(end) - 1
+
+        csv_file.seek(offset)
+        chunks = pd.read_csv(csv_file, names=CSV_COLUMNS, header=None, chunksize=chunksize or 10 ** 6)
+        try:
+            json_file.seek(cut)
+            json_file.truncate()
+            for trades_df in chunks:
+                if last_timestamp is not None:
+                    trades_df = trades_df[trades_df['timestamp'] * 1000 > last_timestamp].copy()
+                trades_df['date'] = pd.to_datetime(trades_df['timestamp'], unit='s', utc=True)
+
+                # Drop 0 volume rows
+                trades_df = trades_df.dropna()
+                if trades_df.empty:
+                    continue
+
+                if has_rows:
+                    json_file.write(b',')
+                json_file.write(trades_df.loc[:, JSON_COLUMNS].to_json(orient="values")[1:-1].encode())
+                has_rows = True
+                nb_rows += len(trades_df)
+                last_timestamp = int(trades_df['timestamp'].iloc[-1]) * 1000
+            json_file.write(b']')
+        except Exception:
+            # Restore the JSON file as it was
+            json_file.seek(cut)
+            json_file.truncate()
+            json_file.write(tail[len(end) - 1:])
+            raise
+
+        # Resume after the last complete line of the CSV file next time
+        csv_file.seek(max(0, stat.st_size - 1))
+        complete = csv_file.read(1) == b'\n'
+
+    return nb_rows, {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'offset': stat.st_size if complete else 0,
+        'last_timestamp': last_timestamp,
+    }
+
+
+def convert(csv_file_path, output_file_path, chunksize=None, incremental=False, manifest_entry=None,
+            data_format='json', compression=None, benchmark=False):
+    start = time.time()
+    benchmark_report = None
+
+    if incremental and os.path.isfile(output_file_path):
+        nb_rows, manifest_entry = convert_file_incremental(csv_file_path, output_file_path, chunksize, manifest_entry)
+        return {'rows': nb_rows, 'duration': max(time.time() - start, 1e-9), 'peak_rss': peak_rss_mb(),
+                'manifest': manifest_entry}
+
+    try:
+        if chunksize:
+            nb_rows = convert_file_streaming(csv_file_path, output_file_path, chunksize)
+        else:
+            nb_rows, benchmark_report = convert_file(csv_file_path, output_file_path, data_format, compression, benchmark)
+    except Exception:
+        # Do not leave a truncated file behind
+        if os.path.isfile(output_file_path):
+            os.remove(output_file_path)
+        raise
+
+    report = {'rows': nb_rows, 'duration': max(time.time() - start, 1e-9), 'peak_rss': peak_rss_mb(),
+              'benchmark': benchmark_report}
+    if incremental:
+        stat = os.stat(csv_file_path)
+        report['manifest'] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'offset': 0,
+                              'last_timestamp': last_json_timestamp(output_file_path)}
+    return report
+
+
+def print_report(csv_file_path, output_file_path, report, prefix=''):
+    print(f"{prefix}{csv_file_path} -> {output_file_path}: {report['rows']} rows in {report['duration']:.1f}s "
+          f"({report['rows'] / report['duration']:.0f} rows/s, peak RSS {report['peak_rss']:.0f} MB)")
+    if report.get('benchmark'):
+        bench = report['benchmark']
+        print(f"{prefix}  load {bench['load_time'] * 1000:.1f} ms, {bench['size'] / 1024 ** 2:.1f} MB "
+              f"(JSON: load {bench['json_load_time'] * 1000:.1f} ms, {bench['json_size'] / 1024 ** 2:.1f} MB, "
+              f"x{bench['json_load_time'] / max(bench['load_time'], 1e-9):.1f} faster)")
+
+
+def convert_all(files, chunksize=None, jobs=1, incremental=False, data_format='json', compression=None,
+                benchmark=False):
+    """
+    Convert the (csv_file_path, output_file_path) list with a pool of jobs processes.
+    A failing file is reported and does not stop the conversion of the others.
+    """
+    start = time.time()
+    nb_rows = 0
+    failures = []
+    manifests = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for csv_file_path, output_file_path in files:
+            manifest_entry = None
+            if incremental:
+                path = manifest_path(output_file_path)
+                manifest = manifests.setdefault(path, load_manifest(path))
+                manifest_entry = manifest.get(os.path.abspath(csv_file_path))
+            future = executor.submit(convert, csv_file_path, output_file_path, chunksize, incremental, manifest_entry,
+                                     data_format, compression, benchmark)
+            futures[future] = (csv_file_path, output_file_path)
+
+        for n, future in enumerate(as_completed(futures), start=1):
+            csv_file_path, output_file_path = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                failures.append(csv_file_path)
+                print(f"[{n}/{len(files)}] {csv_file_path}: FAILED ({e})")
+                continue
+            nb_rows += report['rows']
+            print_report(csv_file_path, output_file_path, report, prefix=f"[{n}/{len(files)}] ")
+            if incremental:
+                manifests[manifest_path(output_file_path)][os.path.abspath(csv_file_path)] = report['manifest']
+
+    for path, manifest in manifests.items():
+        save_manifest(path, manifest)
+
+    duration = max(time.time() - start, 1e-9)
+    print(f"Converted {len(files) - len(failures)}/{len(files)} files, {nb_rows} rows in {duration:.1f}s "
+          f"({nb_rows / duration:.0f} rows/s, {len(files) / duration:.1f} files/s)")
+    if failures:
+        print(f"{len(failures)} failures:")
+        for csv_file_path in failures:
+            print(f"  {csv_file_path}")
+
+    return failures
 
 
 def main(argv):
-    parser = argparse.ArgumentParser(description='Convert CSV OHLCVT data from Kraken to JSON freqtrade format.')
+    parser = argparse.ArgumentParser(description='Convert CSV OHLCVT data from Kraken to freqtrade format.')
     parser.add_argument('input_path', metavar='INPUT_PATH', type=str, nargs='?', default='.', help='Path to the input file or directory (Default: current directory)')
     parser.add_argument('-f', '--fiat', default='EUR', help='Convert files with the specified FIAT (Default: EUR)')
     parser.add_argument('-o', '--output', help='Path to the output file or directory')
+    parser.add_argument('-c', '--chunksize', type=int, help='Stream the conversion by chunks of CHUNKSIZE rows to bound the memory usage (Default: load the whole file)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of files converted in parallel in directory mode (Default: 1)')
+    parser.add_argument('-i', '--incremental', action='store_true', help='Only append the candles newer than the existing JSON files, skip the unchanged CSV files')
+    parser.add_argument('--format', default='json', choices=FILE_EXTENSIONS.keys(), help='Output format (Default: json)')
+    parser.add_argument('--compression', help='Compression of the binary formats: lz4/zstd (feather), snappy/gzip/brotli/zstd (parquet), zlib/blosc/... (hdf5)')
+    parser.add_argument('--benchmark', action='store_true', help='Compare the load time of the written files with the JSON format')
 
     args = parser.parse_args()
+
+    if args.format != 'json' and (args.chunksize or args.incremental):
+        parser.error('--chunksize and --incremental are only supported with the json format')
     
     # If directory => Convert all files
     if os.path.isdir(args.input_path):
@@ -65,22 +371,28 @@ def main(argv):
         else:
             output_dir = args.input_path
 
-        for csv_file in os.listdir(args.input_path):
+        files = []
+        for csv_file in sorted(os.listdir(args.input_path)):
             # Convert only files with the expected name
             if re.findall('.*' + args.fiat + '_[0-9]*\.csv', csv_file):
-                json_file_path = convert_name(csv_file, args.fiat, output_dir)
-                convert_file(os.path.join(args.input_path, csv_file), json_file_path)
+                output_file_path = convert_name(csv_file, args.fiat, output_dir, args.format)
+                files.append((os.path.join(args.input_path, csv_file), output_file_path))
+
+        if convert_all(files, args.chunksize, args.jobs, args.incremental, args.format, args.compression, args.benchmark):
+            sys.exit(1)
     else:
         # Manage output file name
         if args.output:
             if os.path.isdir(args.output):
-                json_file_path = convert_name(args.input_path, args.fiat, args.output)
+                output_file_path = convert_name(args.input_path, args.fiat, args.output, args.format)
             else:
-                json_file_path = args.output
+                output_file_path = args.output
         else:
-            json_file_path = convert_name(args.input_path, args.fiat, os.path.dirname(args.input_path))
+            output_file_path = convert_name(args.input_path, args.fiat, os.path.dirname(args.input_path), args.format)
 
-        convert_file(args.input_path, json_file_path)
+        if convert_all([(args.input_path, output_file_path)], args.chunksize, incremental=args.incremental,
+                       data_format=args.format, compression=args.compression, benchmark=args.benchmark):
+            sys.exit(1)
 
 if __name__ == "__main__":
     main(sys.argv[1:])
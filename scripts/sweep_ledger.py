@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+#
+# SQLite ledger of the hyperopt sweep jobs (strategy x loss function x timeframe x epochs).
+#
+# hyperopt_sweep.py records the status, runtime, result files and output of each job in the
+# ledger. When an interrupted sweep is started again, the jobs already done are skipped and
+# only the missing or failed ones run again (a job still "running" in the ledger was interrupted).
+# A job whose hyperopt finished but whose result may not be in the output yet ("extracting")
+# is not run again: its result is extracted again, without the rows already in the output.
+# The jobs are also keyed by the settings of the sweep (hash of the spaces, config files and
+# output, see hyperopt_sweep.py): a sweep with other settings runs its jobs again.
+#
+# Run as a script, it shows the jobs of a ledger.
+#
+# usage: sweep_ledger.py [-h] [LEDGER]
+
+import sys
+import time
+import sqlite3
+import argparse
+
+RUNNING = 'running'
+# Hyperopt finished, its result not written to the output yet
+EXTRACTING = 'extracting'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        strategy TEXT NOT NULL,
+        loss_function TEXT NOT NULL,
+        timeframe TEXT NOT NULL,
+        epochs INTEGER NOT NULL,
+        settings TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        started REAL,
+        finished REAL,
+        runtime REAL,
+        results_file TEXT,
+        log_file TEXT,
+        output TEXT,
+        error TEXT,
+        PRIMARY KEY (strategy, loss_function, timeframe, epochs, settings)
+    );
+"""
+
+class SweepLedger:
+    """Jobs of the sweeps with the given settings."""
+
+    def __init__(self, path, settings=''):
+        self.path = path
+        self.settings = settings
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def job(self, strategy, loss_function, timeframe, epochs):
+        row = self.connection.execute(
+            'SELECT * FROM jobs '
+            'WHERE strategy = ? AND loss_function = ? AND timeframe = ? AND epochs = ? AND settings = ?',
+            (strategy, loss_function, timeframe, epochs, self.settings)).fetchone()
+        return dict(row) if row else None
+
+    def status(self, strategy, loss_function, timeframe, epochs):
+        job = self.job(strategy, loss_function, timeframe, epochs)
+        return job['status'] if job else None
+
+    def is_done(self, strategy, loss_function, timeframe, epochs):
+        return self.status(strategy, loss_function, timeframe, epochs) == DONE
+
+    def start(self, strategy, loss_function, timeframe, epochs):
+        with self.connection:
+            self.connection.execute("""
+                INSERT INTO jobs (strategy, loss_function, timeframe, epochs, settings, status, attempts, started)
+                VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT (strategy, loss_function, timeframe, epochs, settings) DO UPDATE SET
+                    status = excluded.status, attempts = attempts + 1, started = excluded.started,
+                    finished = NULL, runtime = NULL, error = NULL
+            """, (strategy, loss_function, timeframe, epochs, self.settings, RUNNING, time.time()))
+
+    def _finish(self, strategy, loss_function, timeframe, epochs, status, **fields):
+        fields['status'] = status
+        fields['finished'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self.connection:
+            self.connection.execute(
+                f'UPDATE jobs SET {assignments} '
+                'WHERE strategy = ? AND loss_function = ? AND timeframe = ? AND epochs = ? AND settings = ?',
+                list(fields.values()) + [strategy, loss_function, timeframe, epochs, self.settings])
+
+    def finished(self, strategy, loss_function, timeframe, epochs, runtime, results_file, log_file):
+        """The hyperopt of the job finished, its result is about to be written to the output."""
+        self._finish(strategy, loss_function, timeframe, epochs, EXTRACTING, runtime=runtime,
+                     results_file=results_file, log_file=log_file)
+
+    def done(self, strategy, loss_function, timeframe, epochs, output):
+        self._finish(strategy, loss_function, timeframe, epochs, DONE, output=output)
+
+    def fail(self, strategy, loss_function, timeframe, epochs, error):
+        self._finish(strategy, loss_function, timeframe, epochs, FAILED, error=error)
+
+    def jobs(self):
+        return [dict(row) for row in self.connection.execute(
+            'SELECT * FROM jobs ORDER BY strategy, timeframe, loss_function, epochs, settings')]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Show the jobs of a hyperopt sweep ledger.')
+    parser.add_argument('ledger', metavar='LEDGER', type=str, nargs='?', default='user_data/hyperopt_sweep_ledger.sqlite', help='Ledger file (Default: user_data/hyperopt_sweep_ledger.sqlite)')
+
+    args = parser.parse_args(argv)
+
+    with SweepLedger(args.ledger) as ledger:
+        for job in ledger.jobs():
+            runtime = f"{job['runtime']:.1f}s" if job['runtime'] is not None else '-'
+            print(f"{job['status']:<8} {job['strategy']} {job['loss_function']} {job['timeframe']} "
+                  f"{job['epochs']} epochs [{job['settings'][:8] or '-'}], {job['attempts']} attempts, {runtime} "
+                  f"{job['error'] or job['results_file'] or ''}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
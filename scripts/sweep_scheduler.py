@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+#
+# Adaptive epoch budget for the hyperopt sweep (see the --adaptive option of hyperopt_sweep.py).
+#
+# The epochs of the whole sweep (number of runs x epochs) are shared by the runs in rungs,
+# in successive-halving style:
+# - every run first gets epochs / eta epochs
+# - a run stops as soon as its best objective did not improve for `patience` epochs
+# - after each rung, only the 1/eta runs whose best objective improved the most (relatively,
+#   the loss functions have different scales) continue, with eta times more epochs, until
+#   the budget is spent
+# A continued run is a new hyperopt whose optimizer is told the epochs of the previous rungs,
+# so the search goes on from where it stopped instead of restarting.
+#
+# Run as a script, it simulates the schedule on random improvement curves.
+#
+# usage: sweep_scheduler.py [-h] [-n RUNS] [-e EPOCHS] [--eta ETA] [--patience PATIENCE]
+
+import sys
+import math
+import random
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+
+def relative_improvement(curve, window):
+    """Relative improvement of the best objective (lower is better) over the last `window` epochs of a curve."""
+    if len(curve) <= window:
+        return math.inf
+    before, after = curve[-window - 1], curve[-1]
+    if not math.isfinite(before):
+        return math.inf if math.isfinite(after) else 0.
+    return (before - after) / max(abs(before), 1e-9)
+
+
+class PlateauStopper:
+    """
+    Stop a hyperopt run when its best objective has not improved by more than min_delta
+    (relatively) during the last `patience` epochs.
+    """
+
+    def __init__(self, patience=30, min_delta=0.001, initial_best=math.inf):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best = initial_best
+        self.curve = []
+        self.stopped = False
+
+    def update(self, loss):
+        """Add the objective of an epoch to the curve, return True when the run should stop."""
+        self.best = min(self.best, loss)
+        self.curve.append(self.best)
+        self.stopped = (len(self.curve) > self.patience
+                        and relative_improvement(self.curve, self.patience) <= self.min_delta)
+        return self.stopped
+
+    def install(self, hyperopt):
+        """Check the plateau after each epoch of the hyperopt, stop before the next batch of epochs."""
+        print_results = hyperopt.print_results
+        run_optimizer_parallel = hyperopt.run_optimizer_parallel
+
+        def print_results_and_check(results):
+            print_results(results)
+            self.update(results['loss'])
+
+        def run_optimizer_parallel_unless_stopped(*args, **kwargs):
+            # The epochs of the previous batch are all saved (print_results runs before _save_result):
+            # Hyperopt handles the interruption, it stops the epochs and keeps the results
+            if self.stopped:
+                raise KeyboardInterrupt
+            return run_optimizer_parallel(*args, **kwargs)
+
+        hyperopt.print_results = print_results_and_check
+        hyperopt.run_optimizer_parallel = run_optimizer_parallel_unless_stopped
+
+
+def warm_start(hyperopt, epochs):
+    """Tell the optimizer of the hyperopt the epochs (params and loss) of the previous rungs."""
+    get_optimizer = hyperopt.get_optimizer
+
+    def get_warm_optimizer(*args, **kwargs):
+        optimizer = get_optimizer(*args, **kwargs)
+        points, losses = [], []
+        for epoch in epochs:
+            if math.isfinite(epoch['loss']):
+                points.append([epoch['params_dict'][dimension.name] for dimension in hyperopt.dimensions])
+                losses.append(epoch['loss'])
+        if points:
+            try:
+                optimizer.tell(points, losses)
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Optimizer not warm started: {e}")
+        return optimizer
+
+    hyperopt.get_optimizer = get_warm_optimizer
+
+
+class SuccessiveHalving:
+    """
+    Schedule of the epochs of several runs in rungs.
+    Call next_rung() to get the epochs of the runs of the next rung, then report() the curve of each run.
+    """
+
+    def __init__(self, runs, epochs, eta=3, min_epochs=10):
+        self.eta = eta
+        self.budget = len(runs) * epochs
+        self.used = 0
+        self.rung = 0
+        self.first_epochs = max(min_epochs, epochs // eta)
+        self.min_epochs = min_epochs
+        self.curves = {run: [] for run in runs}
+        self.stopped = set()
+        self.alive = list(runs)
+
+    def next_rung(self):
+        """{run: epochs} of the next rung, empty when the sweep is done."""
+        remaining = self.budget - self.used
+        if self.rung > 0:
+            # Keep the runs still improving, the ones which improved the most
+            improving = [run for run in self.alive if run not in self.stopped]
+            window = max(1, len(self.curves[improving[0]]) // 2) if improving else 1
+            improving.sort(key=lambda run: relative_improvement(self.curves[run], window), reverse=True)
+            self.alive = improving[:math.ceil(len(self.alive) / self.eta)]
+
+        if not self.alive or remaining < self.min_epochs:
+            return {}
+
+        epochs = min(self.first_epochs * self.eta ** self.rung, remaining // len(self.alive))
+        if epochs < self.min_epochs:
+            # Not enough epochs left for all: the best runs get them
+            self.alive = self.alive[:max(1, remaining // self.min_epochs)]
+            epochs = remaining // len(self.alive)
+        self.rung += 1
+        return {run: epochs for run in self.alive}
+
+    def report(self, run, curve, stopped):
+        """Best objective after each epoch of the run in the rung, and whether it stopped on a plateau."""
+        self.used += len(curve)
+        self.curves[run] += curve
+        if stopped:
+            self.stopped.add(run)
+
+    def best(self, run):
+        return self.curves[run][-1] if self.curves[run] else math.inf
+
+
+def simulate(nb_runs, epochs, eta, patience, seed=0):
+    """Schedule runs whose objective improves at random rates, to check the budget allocation."""
+    rng = random.Random(seed)
+    rates = {run: rng.uniform(0.001, 0.05) for run in range(nb_runs)}
+    scheduler = SuccessiveHalving(list(range(nb_runs)), epochs, eta)
+
+    while True:
+        rung = scheduler.next_rung()
+        if not rung:
+            break
+        print(f"rung {scheduler.rung}: {len(rung)} runs x {next(iter(rung.values()))} epochs")
+        for run, run_epochs in rung.items():
+            stopper = PlateauStopper(patience, initial_best=scheduler.best(run))
+            for _ in range(run_epochs):
+                done = len(scheduler.curves[run]) + len(stopper.curve)
+                loss = -(1 - math.exp(-rates[run] * done)) + rng.uniform(0, 0.05)
+                if stopper.update(loss):
+                    break
+            scheduler.report(run, stopper.curve, stopper.stopped)
+
+    print(f"{scheduler.used}/{scheduler.budget} epochs used")
+    for run in sorted(scheduler.curves, key=scheduler.best)[:5]:
+        print(f"run {run}: rate {rates[run]:.3f}, {len(scheduler.curves[run])} epochs, best {scheduler.best(run):.4f}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Simulate the adaptive epoch budget of the hyperopt sweep.')
+    parser.add_argument('-n', '--runs', type=int, default=24, help='Number of runs (Default: 24)')
+    parser.add_argument('-e', '--epochs', type=int, default=100, help='Epochs per run (Default: 100)')
+    parser.add_argument('--eta', type=int, default=3, help='Fraction of the runs kept after each rung (Default: 3)')
+    parser.add_argument('--patience', type=int, default=30, help='Epochs without improvement before stopping a run (Default: 30)')
+
+    args = parser.parse_args(argv)
+
+    simulate(args.runs, args.epochs, args.eta, args.patience)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])